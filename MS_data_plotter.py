@@ -26,15 +26,20 @@ After reading the TOF-MS raw data, the graph is drawn; there are "three sliders"
 """
 import os
 import time
-from collections import Counter
 
 import numpy as np
-import pandas as pd
-from pandas import Series, DataFrame
 
-import matplotlib as mpl
 import matplotlib.pyplot as plt
-from matplotlib.widgets import Slider
+from matplotlib.widgets import Slider, Button
+
+import instrumentation as instr
+import peak_detector as pkd
+import peak_table as pkt
+from ms_data_loader import load_ms_data
+from lod_renderer import MinMaxPyramid, LODLine, LODBars
+from time_window import TimeIndex
+from trace_stats import TraceStats
+from threshold_curve import ThresholdCurve
 
 
 def main():
@@ -46,99 +51,150 @@ def main():
     output_dir = "./outputs_" + local_time + "/"
     os.makedirs(output_dir)
 
+    # 每個檔案的訊號峰列表，最後一次寫入
+    peak_tables = []
+
     # 對於每個 MS_data 檔案
     for file in file_list:
-
-        # 讀取檔案
-        data = pd.read_csv(file, sep=' ', header=None)
-
-        # 指定 column names
-        data.columns = ['micro_sec', 'mini_volts']
-
-        # 排版
-        fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(10, 8))
-        plt.subplots_adjust(left=0.1, bottom=0.3)
-        fig.suptitle(f'{file.split("/")[-1]}')
-
-        # 設置滑桿位置
-        ax_time_anchor_slider = plt.axes([0.1, 0.25, 0.8, 0.02])
-        ax_zoom_slider = plt.axes([0.1, 0.15, 0.8, 0.02])
-        ax_signal_ratio_slider = plt.axes([0.1, 0.05, 0.8, 0.02])
-
-        # 創建滑桿
-        time_anchor_slider = Slider(ax_time_anchor_slider, 'Time anchor', data['micro_sec'].min(), data['micro_sec'].max(), valinit=data['micro_sec'].min(), valstep=0.00025)
-        zoom_slider = Slider(ax_zoom_slider, 'Zoom', 0.00125, data['micro_sec'].max(), valinit=data['micro_sec'].max(), valstep=0.00025)
-        signal_ratio_slider = Slider(ax_signal_ratio_slider, 'SNR', 0.01, 1, valinit=0.6, valstep=0.01)
-
-        # (1) 無標註的原始圖
-        ax1.plot(data['micro_sec'], data['mini_volts'], lw=1)
-        ax1.set_title('Unlabeled')
-
-        # (2) 只包含訊號的無標註圖
-        ax2.bar(data['micro_sec'], data['mini_volts'], width=0.2)
-        ax2.set_title('Signals')
-
-        # (3) 標記了雜混基線、區間，以及訊號範圍的圖
-        ax3.plot(data['micro_sec'], data['mini_volts'], lw=1)
-        ax3.axhline(y=data['mini_volts'].mode().iloc[0], color='red', linestyle='--')  # baseline
-        ax3.set_title('labeled noise Baseline, Threshold & Signal')
-
-        # 更新時間錨及縮放的函數
-        def update(val):
-            time_anchor = time_anchor_slider.val
-            zoom = zoom_slider.val
-            sr = signal_ratio_slider.val
+        # MS_PROFILE 開啟時，每個檔案的各階段耗時彙整為一筆紀錄
+        with instr.file_record(file):
+
+            # 讀取檔案 (經由快取)
+            micro_sec, mini_volts = load_ms_data(file)
+
+            # 一次計算基線、最大值等統計量
+            stats = TraceStats(mini_volts)
+
+            # 建立縮放用的最小/最大值金字塔，以及可見範圍的時間索引
+            pyramid = MinMaxPyramid(micro_sec, mini_volts)
+            time_index = TimeIndex(micro_sec)
+
+            # 排版
+            fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(10, 8))
+            plt.subplots_adjust(left=0.1, bottom=0.3, right=0.72)
+            fig.suptitle(f'{file.split("/")[-1]}')
+            instr.watch_figure(fig)  # MS_PROFILE 開啟時，量測每次重繪的時間
+
+            # 設置滑桿位置
+            ax_time_anchor_slider = plt.axes([0.1, 0.25, 0.8, 0.02])
+            ax_zoom_slider = plt.axes([0.1, 0.15, 0.8, 0.02])
+            ax_signal_ratio_slider = plt.axes([0.1, 0.05, 0.8, 0.02])
+
+            # 創建滑桿
+            time_anchor_slider = Slider(ax_time_anchor_slider, 'Time anchor', micro_sec[0], micro_sec[-1], valinit=micro_sec[0], valstep=0.00025)
+            zoom_slider = Slider(ax_zoom_slider, 'Zoom', 0.00125, micro_sec[-1], valinit=micro_sec[-1], valstep=0.00025)
+            signal_ratio_slider = Slider(ax_signal_ratio_slider, 'SNR', 0.01, 1, valinit=0.6, valstep=0.01)
+
+            # 訊號數 - SNR 曲線 (每個檔案只計算一次)，以及套用建議值的按鈕
+            curve = ThresholdCurve(plt.axes([0.8, 0.55, 0.18, 0.3]), stats)
+            curve.set_signal_ratio(signal_ratio_slider.val)
+            suggest_button = Button(plt.axes([0.8, 0.4, 0.1, 0.04]), 'Suggest')
+
+            def suggest(event):
+                # 將滑桿移到曲線的轉折點，由滑桿的更新事件重繪
+                if curve.suggestion is not None:
+                    signal_ratio_slider.set_val(curve.suggestion)
+
+            suggest_button.on_clicked(suggest)
+
+            # xlim_changed 回呼只弱參照這些物件，以 renderers 保留參照直到視窗關閉
+            renderers = []
+
+            # (1) 無標註的原始圖
+            renderers.append(LODLine(ax1, pyramid, lw=1))
+            ax1.set_title('Unlabeled')
+
+            # (2) 只包含訊號的無標註圖
+            renderers.append(LODBars(ax2, pyramid, width=0.2))  # 只畫可見範圍內的長條
+            ax2.set_title('Signals')
+
+            # (3) 標記了雜混基線、區間，以及訊號範圍的圖
+            renderers.append(LODLine(ax3, pyramid, lw=1))
+            ax3.axhline(y=stats.baseline, color='red', linestyle='--')  # baseline
+            ax3.set_title('labeled noise Baseline, Threshold & Signal')
+            max_noise_line = ax3.axhline(y=np.nan, color='#FE9900', linestyle='--')  # max_noise line
+            stars, = ax3.plot([], [], marker='*', color='red', markersize=10, linestyle='')  # 所有訊號峰共用一個 artist
+            window_text = ax3.text(0.99, 0.95, '', transform=ax3.transAxes, ha='right', va='top', fontsize=8)
+
+            # 目前門檻之上的訊號點時間 (依時間排序)；由 update_2 更新
+            signal_times = [TimeIndex(micro_sec[stats.indices_above(stats.max_noise(signal_ratio_slider.val))])]
+
+            # 可見範圍內的統計量：最大值取自金字塔、訊號點數以二分搜尋，不掃描視窗內的資料
+            def show_window_stats():
+                window = time_index.window_stats(*ax3.get_xlim(), pyramid, signal_times[0])
+                window_text.set_text(f"{window['signals']} signal samples / {window['samples']} samples in view, max {window['max']:.3f}")
+
+            show_window_stats()
+
+            # 更新時間錨及縮放的函數
+            def update(val):
+                time_anchor = time_anchor_slider.val
+                zoom = zoom_slider.val
+                sr = signal_ratio_slider.val
             
-            # 更新原始圖
-            ax1.set_xlim(time_anchor - zoom/2, time_anchor + zoom/2)
+                # 更新原始圖
+                ax1.set_xlim(time_anchor - zoom/2, time_anchor + zoom/2)
             
-            # 更新只包含訊號的圖
-            ax2.set_xlim(time_anchor - zoom/2, time_anchor + zoom/2)
+                # 更新只包含訊號的圖
+                ax2.set_xlim(time_anchor - zoom/2, time_anchor + zoom/2)
             
-            # 更新標記圖
-            ax3.set_xlim(time_anchor - zoom/2, time_anchor + zoom/2)
-
-            fig.canvas.draw_idle()
-
-        # 更新 signal_ratio 的函數
-        def update_2(val):
-            time_anchor = time_anchor_slider.val
-            zoom = zoom_slider.val
-            sr = signal_ratio_slider.val
+                # 更新標記圖
+                ax3.set_xlim(time_anchor - zoom/2, time_anchor + zoom/2)
+                show_window_stats()
+
+                fig.canvas.draw_idle()
+
+            # 更新 signal_ratio 的函數
+            @instr.timed('threshold_update')
+            def update_2(val):
+                time_anchor = time_anchor_slider.val
+                zoom = zoom_slider.val
+                sr = signal_ratio_slider.val
             
-            # 更新原始圖
-            ax1.set_xlim(time_anchor - zoom/2, time_anchor + zoom/2)
+                # 更新原始圖
+                ax1.set_xlim(time_anchor - zoom/2, time_anchor + zoom/2)
             
-            # 更新只包含訊號的圖
-            ax2.set_xlim(time_anchor - zoom/2, time_anchor + zoom/2)
+                # 更新只包含訊號的圖
+                ax2.set_xlim(time_anchor - zoom/2, time_anchor + zoom/2)
             
-            # 更新標記圖
-            ax3.set_xlim(time_anchor - zoom/2, time_anchor + zoom/2)
+                # 更新標記圖
+                ax3.set_xlim(time_anchor - zoom/2, time_anchor + zoom/2)
+
+                # 根據 signal ratio 計算 max_noise
+                max_noise = stats.max_noise(sr)
+                max_noise_line.set_ydata([max_noise, max_noise])
 
-            # 根據 signal ratio 計算 max_noise
-            max_noise = data['mini_volts'].max() - (data['mini_volts'].max() - data['mini_volts'].mode().iloc[0]) * sr
-            ax3.axhline(y=max_noise, color='#FE9900', linestyle='--')  # max_noise line
+                # 一次偵測所有超過 max_noise 的訊號峰，並於峰頂標記
+                signal_idx = stats.indices_above(max_noise)
+                peaks = pkd.detect_peaks(micro_sec, mini_volts, max_noise, above=signal_idx)
+                stars.set_data(peaks['time'], peaks['height'])
+                signal_times[0] = TimeIndex(micro_sec[signal_idx])
+                curve.set_signal_ratio(sr)
+                show_window_stats()
 
-            # 對於每個時間點
-            for i, time in enumerate(data['micro_sec']):
-            # 判斷是否為信號，若是則標記時間點
-                if data['mini_volts'].iloc[i] > max_noise:
-                    ax3.plot(time, data['mini_volts'].iloc[i], marker='*', color='red', markersize=10)
+                fig.canvas.draw_idle()
 
-            fig.canvas.draw_idle()
+            # 設置滑桿的更新事件
+            time_anchor_slider.on_changed(update)
+            zoom_slider.on_changed(update)
+            signal_ratio_slider.on_changed(update_2)
 
-        # 設置滑桿的更新事件
-        time_anchor_slider.on_changed(update)
-        zoom_slider.on_changed(update)
-        signal_ratio_slider.on_changed(update_2)
+            plt.show()
 
-        plt.show()
+            # 按 Enter 後儲存圖表
+            plt.savefig(output_dir + file.split("/")[-1].replace(".data", ".png"))
 
-        # 按 Enter 後儲存圖表
-        plt.savefig(output_dir + file.split("/")[-1].replace(".data", ".png"))
-        
+            # 以最後的 SNR 偵測訊號峰，並加入列表
+            max_noise = stats.max_noise(signal_ratio_slider.val)
+            peaks = pkd.detect_peaks(micro_sec, mini_volts, max_noise, baseline=stats.baseline, above=stats.indices_above(max_noise))
+            peak_tables.append(pkt.build_peak_table(file.split("/")[-1], peaks, micro_sec, stats.baseline, stats.noise_sigma))
 
+    # 儲存所有檔案的訊號峰列表
+    pkt.write_peak_tables(peak_tables, pkt.peak_table_path(output_dir))
 
+    # MS_PROFILE 開啟時，列出各階段的耗時
+    instr.print_summary()
 
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
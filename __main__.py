@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+所有命令列工具的單一入口：`python <本資料夾> <子命令> [參數...]`，例如 `python . roi-batch ./images/ --roi-template roi.json`。
+
+- 只在執行某個子命令時才匯入該模組 (以及 matplotlib、pandas、cv2 等套件)，列出說明或執行不需要的套件不會被載入；
+  因此只裝了 `general` 或 `opencv` 環境時，也都能使用對應的子命令。
+- `python . startup` 以全新的直譯器量測每個子命令的匯入時間，作為啟動時間的基準。
+
+---
+
+Single entry point of all the command-line tools: `python <this folder> <subcommand> [arguments...]`, e.g.
+`python . roi-batch ./images/ --roi-template roi.json`.
+
+- A subcommand's module (and matplotlib, pandas, cv2, ...) is imported only when that subcommand runs; listing
+  the help or running another subcommand does not load them, so each subcommand works in an environment with
+  only its own dependencies (`general` or `opencv`, see README.md).
+- `python . startup` measures the import time of every subcommand in a fresh interpreter, as a startup baseline.
+"""
+import os
+import sys
+import subprocess
+
+
+# 子命令 -> (模組, 說明)
+COMMANDS = {
+    'plot': ('MS_data_plotter', "interactive TOF-MS plotter with three sliders"),
+    'simple-plot': ('simple_MS_data_plotter', "interactive TOF-MS plotter with buttons"),
+    'ms-batch': ('ms_batch', "headless batch mode of the TOF-MS plotter"),
+    'ms-bench': ('ms_benchmark', "benchmark of the TOF-MS pipeline on synthetic traces"),
+    'mz-stack': ('mass_calibration', "mass calibration and rebinning of traces onto an m/z grid"),
+    'roi': ('signal_detector_in_roi', "interactive ROI selection and signal detection"),
+    'roi-batch': ('roi_batch', "headless batch mode of the ROI signal detector"),
+    'roi-stream': ('roi_stream', "per-frame ROI signal counts of a video or image sequence"),
+    'roi-tiled': ('tiled_roi', "tiled ROI statistics of very large images"),
+    'catalog': ('acquisition_catalog', "SQLite index of acquisition files by the settings in their names"),
+}
+
+
+def usage():
+    lines = [f"usage: python {os.path.basename(os.path.dirname(os.path.abspath(__file__)))} <subcommand> [arguments...]", "", "subcommands:"]
+    lines += [f"  {name:<12} {description}" for name, (_, description) in COMMANDS.items()]
+    lines += [f"  {'startup':<12} import time of every subcommand, in a fresh interpreter each"]
+    return "\n".join(lines)
+
+
+def startup():
+    """
+    Print the import time of every subcommand module, each measured in a fresh interpreter.
+
+    Returns:
+    None
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = "import time; start = time.perf_counter(); import {}; print(time.perf_counter() - start)"
+    for name, (module, _) in COMMANDS.items():
+        result = subprocess.run([sys.executable, "-c", code.format(module)], cwd=here, capture_output=True, text=True)
+        if result.returncode == 0:
+            print(f"{name:<12} {float(result.stdout.split()[-1]) * 1000:8.1f} ms")
+        else:
+            print(f"{name:<12} {'failed':>8}   {result.stderr.strip().splitlines()[-1]}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return
+    if argv[0] == 'startup':
+        startup()
+        return
+    if argv[0] not in COMMANDS:
+        sys.exit(f"unknown subcommand: {argv[0]}\n\n{usage()}")
+
+    # 只匯入選定的子命令；其 main() 以 argparse 讀取 sys.argv
+    module = __import__(COMMANDS[argv[0]][0])
+    sys.argv = [f"{sys.argv[0]} {argv[0]}", *argv[1:]]
+    module.main()
+
+
+if __name__ == "__main__":
+    main()
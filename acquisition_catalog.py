@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+量測檔案的參數目錄：掃描資料夾一次，將檔名中的量測設定 (電壓、延遲、發數、MCP 電壓、scale、取樣率...)
+解析為有型別的欄位，連同檔案大小與修改時間存入本機的 SQLite 索引；重新掃描時只處理新增、變動或刪除的檔案。
+
+- 檔名範例：`20240612_132_20.01k_19.05k_388ns_20us_100shot_F_MCP2.1kV_scal-1000mV_R250-250ohm_4GS.png`、
+  `392_20k_19.14_660ns_33.205-33.255_0.png`；無法辨識的片段保留在 `tags` 欄位。
+- 批次工具 (`ms_batch.py`、`roi_batch.py`) 可用 `--select delay_ns=660 mcp_kv=2.1` 直接選出檔案，不必每次重新列出資料夾。
+- 用法：`python acquisition_catalog.py scan ./MS_data/ ./images/`、`python acquisition_catalog.py select delay_ns=660`
+
+---
+
+Catalog of acquisition files: folders are scanned once, the acquisition settings encoded in the file names
+(voltages, delay, shot count, MCP voltage, scale, sample rate...) are parsed into typed columns and stored
+with the file size and mtime in a local SQLite index; a rescan only processes new, changed or deleted files.
+
+- Name examples: `20240612_132_20.01k_19.05k_388ns_20us_100shot_F_MCP2.1kV_scal-1000mV_R250-250ohm_4GS.png`,
+  `392_20k_19.14_660ns_33.205-33.255_0.png`; unrecognized parts are kept in the `tags` column.
+- The batch tools (`ms_batch.py`, `roi_batch.py`) take `--select delay_ns=660 mcp_kv=2.1` to pick their files
+  without listing the folders again.
+- Usage: `python acquisition_catalog.py scan ./MS_data/ ./images/`, `python acquisition_catalog.py select delay_ns=660`
+"""
+import os
+import re
+import sqlite3
+import argparse
+
+
+DEFAULT_CATALOG = "./.ms_catalog.sqlite"
+
+# 由檔名解析出的欄位 -> SQLite 型別
+PARAMETER_COLUMNS = {
+    'date': 'TEXT',               # 量測日期 (YYYY-MM-DD)
+    'run': 'INTEGER',             # 量測編號
+    'voltage1_kv': 'REAL',        # 第一個電壓 (kV)，例如 20.01k
+    'voltage2_kv': 'REAL',        # 第二個電壓 (kV)，例如 19.05k 或 19.14
+    'delay_ns': 'REAL',           # 延遲 (ns)
+    'record_us': 'REAL',          # 紀錄長度 (μs)
+    'window_start_us': 'REAL',    # 時間區間起點 (μs)，例如 33.205-33.255
+    'window_end_us': 'REAL',      # 時間區間終點 (μs)
+    'shots': 'INTEGER',           # 發數
+    'mcp_kv': 'REAL',             # MCP 電壓 (kV)
+    'scale_mv': 'REAL',           # 示波器 scale (mV)
+    'resistance_ohm': 'TEXT',     # 電阻 (ohm)，例如 250-250
+    'sample_rate_gs': 'REAL',     # 取樣率 (GS/s)
+    'max_count': 'INTEGER',       # MAX 數值
+    'frame': 'INTEGER',           # 檔名最後的序號
+    'tags': 'TEXT',               # 其餘無法辨識的片段
+}
+
+# 單一片段的格式 -> (欄位, 轉換)；依序比對，第一個符合者為準
+_TOKEN_PATTERNS = [
+    (re.compile(r'^(\d+(?:\.\d+)?)ns$'), 'delay_ns', float),
+    (re.compile(r'^(\d+(?:\.\d+)?)us$'), 'record_us', float),
+    (re.compile(r'^(\d+)shots?$'), 'shots', int),
+    (re.compile(r'^MCP(\d+(?:\.\d+)?)kV$', re.IGNORECASE), 'mcp_kv', float),
+    (re.compile(r'^scal-?(\d+(?:\.\d+)?)mV$', re.IGNORECASE), 'scale_mv', float),
+    (re.compile(r'^R([\d.\-]+)ohm$', re.IGNORECASE), 'resistance_ohm', str),
+    (re.compile(r'^(\d+(?:\.\d+)?)GS$', re.IGNORECASE), 'sample_rate_gs', float),
+    (re.compile(r'^MAX(\d+)$', re.IGNORECASE), 'max_count', int),
+]
+
+
+def parse_file_name(name):
+    """
+    Parse the acquisition settings encoded in a file name.
+
+    Parameters:
+    name (str): File name or path; the extension is ignored.
+
+    Returns:
+    dict: Column -> value for every recognized setting (see `PARAMETER_COLUMNS`); missing ones are absent.
+    """
+    tokens = os.path.splitext(os.path.basename(name))[0].split('_')
+    params = {}
+    voltages = []
+    numbers = []   # 量測編號之後的整數
+    tags = []
+
+    for i, token in enumerate(tokens):
+        token = token.strip()
+        if i == 0 and re.fullmatch(r'20\d{6}', token):
+            params['date'] = f"{token[:4]}-{token[4:6]}-{token[6:]}"
+            continue
+        if re.fullmatch(r'\d+(?:\.\d+)?k', token):
+            voltages.append(float(token[:-1]))
+            continue
+        if re.fullmatch(r'\d+\.\d+', token) and len(voltages) == 1:
+            voltages.append(float(token))  # 例如 "20k_19.14"：第二個電壓省略了單位
+            continue
+        window = re.fullmatch(r'(\d+(?:\.\d+)?)-(\d+(?:\.\d+)?)', token)
+        if window:
+            params['window_start_us'], params['window_end_us'] = float(window[1]), float(window[2])
+            continue
+        if re.fullmatch(r'\d+', token):
+            # 第一個整數為量測編號，最後一個為序號，其餘保留在 tags
+            if 'run' in params:
+                numbers.append(token)
+            else:
+                params['run'] = int(token)
+            continue
+        for pattern, column, convert in _TOKEN_PATTERNS:
+            match = pattern.fullmatch(token)
+            if match:
+                params[column] = convert(match[1])
+                break
+        else:
+            tags.append(token)
+
+    if numbers:
+        params['frame'] = int(numbers[-1])
+        tags += numbers[:-1]
+    if voltages:
+        params['voltage1_kv'] = voltages[0]
+    if len(voltages) > 1:
+        params['voltage2_kv'] = voltages[1]
+    if tags:
+        params['tags'] = '_'.join(tags)
+    return params
+
+
+class AcquisitionCatalog():
+    def __init__(self, path=DEFAULT_CATALOG):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        columns = ", ".join(f"{column} {sql_type}" for column, sql_type in PARAMETER_COLUMNS.items())
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, directory TEXT, name TEXT, extension TEXT, size INTEGER, mtime_ns INTEGER, "
+            f"{columns})"
+        )
+        for column in ('directory', *PARAMETER_COLUMNS):
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS files_{column} ON files ({column})")
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def scan(self, directory, extensions=None):
+        """
+        Index the files of a folder (recursively); only new or changed files are parsed, and files that no
+        longer exist are removed.
+
+        Parameters:
+        directory (str): Folder to scan.
+        extensions (tuple): Only index these extensions (e.g. (".data", ".png"), case-insensitive); all files by
+        default. Indexed files of other extensions are kept as they are.
+
+        Returns:
+        dict: Number of 'added', 'updated', 'removed' and 'unchanged' files.
+        """
+        directory = os.path.abspath(directory)
+        extensions = tuple(extension.lower() for extension in extensions) if extensions else None
+        prefix = os.path.join(directory, '')  # 子資料夾的前綴
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in self.connection.execute(
+            "SELECT path, size, mtime_ns FROM files WHERE directory = ? OR substr(directory, 1, ?) = ?",
+            (directory, len(prefix), prefix))}
+
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        rows = []
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                previous = known.pop(path, None)  # 仍存在的檔案即使被略過也不算移除
+                if extensions and not name.lower().endswith(extensions):
+                    continue
+                stat = os.stat(path)
+                if previous == (stat.st_size, stat.st_mtime_ns):
+                    counts['unchanged'] += 1
+                    continue
+                counts['updated' if previous else 'added'] += 1
+                params = parse_file_name(name)
+                rows.append((path, root, name, os.path.splitext(name)[1].lower(), stat.st_size, stat.st_mtime_ns,
+                             *(params.get(column) for column in PARAMETER_COLUMNS)))
+
+        placeholders = ", ".join("?" * (6 + len(PARAMETER_COLUMNS)))
+        self.connection.executemany(f"INSERT OR REPLACE INTO files VALUES ({placeholders})", rows)
+        self.connection.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in known])
+        counts['removed'] = len(known)
+        self.connection.commit()
+        return counts
+
+    def select(self, directory=None, extension=None, tolerance=1e-9, **conditions):
+        """
+        Paths of the indexed files matching all the conditions, ordered by path.
+
+        Parameters:
+        directory (str): Only files directly inside this folder; optional.
+        extension (str): Only files with this extension (e.g. ".data"); optional.
+        tolerance (float): Tolerance of the comparisons of REAL columns.
+        conditions: Column=value pairs, e.g. `delay_ns=660, mcp_kv=2.1`.
+
+        Returns:
+        list
+        """
+        clauses, values = [], []
+        if directory is not None:
+            clauses.append("directory = ?")
+            values.append(os.path.abspath(directory))
+        if extension is not None:
+            clauses.append("extension = ?")
+            values.append(extension.lower())
+        for column, value in conditions.items():
+            if column not in PARAMETER_COLUMNS:
+                raise KeyError(f"unknown column: {column}")
+            if PARAMETER_COLUMNS[column] == 'REAL':
+                clauses.append(f"ABS({column} - ?) <= ?")
+                values += [float(value), tolerance]
+            else:
+                clauses.append(f"{column} = ?")
+                values.append(value)
+
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        return [path for path, in self.connection.execute(f"SELECT path FROM files{where} ORDER BY path", values)]
+
+    def query(self, sql, parameters=()):
+        """
+        Run any SELECT on the `files` table, e.g. "SELECT delay_ns, COUNT(*) FROM files GROUP BY delay_ns".
+
+        Returns:
+        list: Rows as tuples.
+        """
+        return self.connection.execute(sql, parameters).fetchall()
+
+
+def parse_conditions(pairs):
+    """
+    Parse "column=value" strings, converting the values to the type of their column.
+
+    Returns:
+    dict
+    """
+    conditions = {}
+    for pair in pairs:
+        column, _, value = pair.partition('=')
+        if column not in PARAMETER_COLUMNS or not value:
+            raise ValueError(f"expected <column>=<value> with a column of {list(PARAMETER_COLUMNS)}: {pair}")
+        conditions[column] = {'REAL': float, 'INTEGER': int, 'TEXT': str}[PARAMETER_COLUMNS[column]](value)
+    return conditions
+
+
+def select_files(directory, pairs, catalog_path=DEFAULT_CATALOG, extension=None):
+    """
+    Rescan `directory` incrementally and return its files matching the "column=value" conditions.
+
+    Returns:
+    list
+    """
+    with AcquisitionCatalog(catalog_path) as catalog:
+        catalog.scan(directory)
+        return catalog.select(directory, extension, **parse_conditions(pairs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index acquisition files by the settings in their names.")
+    parser.add_argument('--catalog', default=DEFAULT_CATALOG, help="SQLite file of the index")
+    commands = parser.add_subparsers(dest='command', required=True)
+    scan = commands.add_parser('scan', help="index (or incrementally update) folders")
+    scan.add_argument('directories', nargs='+')
+    scan.add_argument('--extensions', nargs='*', default=None, help='e.g. ".data" ".png"')
+    select = commands.add_parser('select', help="list the indexed files matching column=value conditions")
+    select.add_argument('conditions', nargs='*', help=f"column=value, columns: {', '.join(PARAMETER_COLUMNS)}")
+    select.add_argument('--directory', default=None)
+    select.add_argument('--extension', default=None)
+    args = parser.parse_args()
+
+    with AcquisitionCatalog(args.catalog) as catalog:
+        if args.command == 'scan':
+            for directory in args.directories:
+                counts = catalog.scan(directory, args.extensions)
+                print(f"{directory}: " + ", ".join(f"{value} {key}" for key, value in counts.items()))
+        else:
+            for path in catalog.select(args.directory, args.extension, **parse_conditions(args.conditions)):
+                print(path)
+
+
+if __name__ == "__main__":
+    main()
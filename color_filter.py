@@ -3,46 +3,84 @@
 import cv2 as cv
 import numpy as np
 
-def empty(v):
-    pass
+from image_cache import read_image
+from color_classifier import ColorClassifier
+
+# 預覽視窗的最大寬度；較大的影像先縮小後再即時過濾，按下 Enter 時才以原尺寸計算遮罩
+PREVIEW_WIDTH = 1280
+
+def trackbar_color_filter(img, converted, trackbars, img_window, preview_width=PREVIEW_WIDTH):
+    """
+    Interactive color filter driven by trackbar callbacks.
+
+    The callbacks only mark the filter as changed; the loop recomputes it once per `cv.waitKey`
+    (coalescing any number of trackbar events), and only when something changed. The recomputation runs on
+    a downscaled preview of large images; the full-resolution mask is computed once, on Enter.
+
+    Parameters:
+    img (numpy.ndarray): Decoded BGR image.
+    converted (function): Converts a BGR image to the color space of the trackbars.
+    trackbars (list): (name, initial value, maximum) of the six trackbars, in the order
+        channel 1 min, channel 1 max, channel 2 min, channel 2 max, channel 3 min, channel 3 max.
+    img_window (str): Name of the window showing the (preview) image.
+    preview_width (int): Maximum width of the preview.
+
+    Returns:
+    tuple: (result, mask) at full resolution.
+    """
+    cv.namedWindow('Color Filter')
 
-def hsv_color_filter(img, return_result=True, return_mask=False):
-    img = cv.imread(img, cv.IMREAD_UNCHANGED)
+    changed = [True]  # 由回呼函數標記，主迴圈檢查後才重新計算
+    def on_change(value):
+        changed[0] = True
 
-    cv.namedWindow('Color Filter')
-    
-    cv.createTrackbar('Hue Min', 'Color Filter', 0, 179, empty)
-    cv.createTrackbar('Hue Max', 'Color Filter', 179, 179, empty)
-    cv.createTrackbar('Sat Min', 'Color Filter', 89, 255, empty)
-    cv.createTrackbar('Sat Max', 'Color Filter', 255, 255, empty)
-    cv.createTrackbar('Val Min', 'Color Filter', 209, 255, empty)
-    cv.createTrackbar('Val Max', 'Color Filter', 255, 255, empty)
-    
-    hsv = cv.cvtColor(img, cv.COLOR_BGR2HSV)
+    for name, value, maximum in trackbars:
+        cv.createTrackbar(name, 'Color Filter', value, maximum, on_change)
 
-    while True:
+    def bounds():
+        positions = [cv.getTrackbarPos(name, 'Color Filter') for name, _, _ in trackbars]
+        return np.array(positions[0::2]), np.array(positions[1::2])
 
-        h_min = cv.getTrackbarPos('Hue Min', 'Color Filter')
-        h_max = cv.getTrackbarPos('Hue Max', 'Color Filter')
-        s_min = cv.getTrackbarPos('Sat Min', 'Color Filter')
-        s_max = cv.getTrackbarPos('Sat Max', 'Color Filter')
-        v_min = cv.getTrackbarPos('Val Min', 'Color Filter')
-        v_max = cv.getTrackbarPos('Val Max', 'Color Filter')
-    
-        lower = np.array([h_min, s_min, v_min])
-        upper = np.array([h_max, s_max, v_max])
-    
-        mask = cv.inRange(hsv, lower, upper)
-        result = cv.bitwise_and(img, img, mask=mask)
-    
-        cv.imshow('img', img)
-        # cv.imshow('hsv', hsv)
-        cv.imshow('mask', mask)
-        cv.imshow('reslut', result)
+    # 大影像以縮小的預覽即時過濾
+    scale = min(1.0, preview_width / img.shape[1])
+    preview = cv.resize(img, None, fx=scale, fy=scale, interpolation=cv.INTER_AREA) if scale < 1 else img
+    preview_converted = converted(preview)
+    cv.imshow(img_window, preview)  # 原圖不會改變，只需顯示一次
 
-        if cv.waitKey(1) == 13:  # 當按下 Enter 鍵時
+    while True:
+        if changed[0]:
+            changed[0] = False
+            lower, upper = bounds()
+            mask = cv.inRange(preview_converted, lower, upper)
+            cv.imshow('mask', mask)
+            cv.imshow('reslut', cv.bitwise_and(preview, preview, mask=mask))
+
+        if cv.waitKey(30) == 13:  # 當按下 Enter 鍵時
             break
-    
+
+    # 以原尺寸計算最終的遮罩
+    lower, upper = bounds()
+    mask = cv.inRange(converted(img) if scale < 1 else preview_converted, lower, upper)
+    result = cv.bitwise_and(img, img, mask=mask)
+    return result, mask
+
+def hsv_color_filter(img, return_result=True, return_mask=False):
+    img = read_image(img)  # 可傳入影像路徑 (經由快取解碼) 或已解碼的影像
+
+    result, mask = trackbar_color_filter(
+        img,
+        lambda bgr: cv.cvtColor(bgr, cv.COLOR_BGR2HSV),
+        [
+            ('Hue Min', 0, 179),
+            ('Hue Max', 179, 179),
+            ('Sat Min', 89, 255),
+            ('Sat Max', 255, 255),
+            ('Val Min', 209, 255),
+            ('Val Max', 255, 255),
+            ],
+        'img'
+        )
+
     if return_result and return_mask:
         return result, mask
     elif return_result:
@@ -51,39 +89,21 @@ def hsv_color_filter(img, return_result=True, return_mask=False):
         return mask
 
 def bgr_color_filter(img, return_result=True, return_mask=False):
-    img = cv.imread(img, cv.IMREAD_UNCHANGED)
-
-    cv.namedWindow('Color Filter')
-    
-    cv.createTrackbar('Blue Min', 'Color Filter', 0, 255, empty)
-    cv.createTrackbar('Blue Max', 'Color Filter', 179, 255, empty)
-    cv.createTrackbar('Green Min', 'Color Filter', 89, 255, empty)
-    cv.createTrackbar('Green Max', 'Color Filter', 255, 255, empty)
-    cv.createTrackbar('Red Min', 'Color Filter', 209, 255, empty)
-    cv.createTrackbar('Red Max', 'Color Filter', 255, 255, empty)
-    
-    img2 = img
-
-    while True:
-        b_min = cv.getTrackbarPos('Blue Min', 'Color Filter')
-        b_max = cv.getTrackbarPos('Blue Max', 'Color Filter')
-        g_min = cv.getTrackbarPos('Green Min', 'Color Filter')
-        g_max = cv.getTrackbarPos('Green Max', 'Color Filter')
-        r_min = cv.getTrackbarPos('Red Min', 'Color Filter')
-        r_max = cv.getTrackbarPos('Red Max', 'Color Filter')
-    
-        lower = np.array([b_min, g_min, r_min])
-        upper = np.array([b_max, g_max, r_max])
-    
-        mask = cv.inRange(img2, lower, upper)
-        result = cv.bitwise_and(img2, img2, mask=mask)
-    
-        cv.imshow('img2', img2)
-        cv.imshow('mask', mask)
-        cv.imshow('reslut', result)
-
-        if cv.waitKey(1) == 13:  # 當按下 Enter 鍵時
-            break
+    img = read_image(img)  # 可傳入影像路徑 (經由快取解碼) 或已解碼的影像
+
+    result, mask = trackbar_color_filter(
+        img,
+        lambda bgr: bgr,
+        [
+            ('Blue Min', 0, 255),
+            ('Blue Max', 179, 255),
+            ('Green Min', 89, 255),
+            ('Green Max', 255, 255),
+            ('Red Min', 209, 255),
+            ('Red Max', 255, 255),
+            ],
+        'img2'
+        )
 
     if return_result and return_mask:
         return result, mask
@@ -92,26 +112,18 @@ def bgr_color_filter(img, return_result=True, return_mask=False):
     elif return_mask:
         return mask
     
-def default_bgr_color_filter(img, return_result=False, return_mask=True):
-    img = cv.imread(img, cv.IMREAD_UNCHANGED)
-
-    b_min = 30
-    b_max = 206
-    g_min = 4
-    g_max = 203
-    r_min = 171
-    r_max = 255
+# 預設的訊號顏色範圍 [b_min, g_min, r_min] 至 [b_max, g_max, r_max]，只建立一次
+default_classifier = ColorClassifier().add_bgr_class('signal', [30, 4, 171], [206, 203, 255])
 
-    lower = np.array([b_min, g_min, r_min])
-    upper = np.array([b_max, g_max, r_max])
+def default_bgr_color_filter(img, return_result=False, return_mask=True):
+    img = read_image(img)  # 可傳入影像路徑 (經由快取解碼) 或已解碼的影像
 
-    mask = cv.inRange(img, lower, upper)
-    result = cv.bitwise_and(img, img, mask=mask)
+    mask = default_classifier.mask(img, 'signal')
 
     if return_result and return_mask:
-        return result, mask
+        return cv.bitwise_and(img, img, mask=mask), mask
     elif return_result:
-        return result
+        return cv.bitwise_and(img, img, mask=mask)
     elif return_mask:
         return mask
     
@@ -125,5 +137,3 @@ def main():
 if __name__ == "__main__":
     img = "./images/392_20k_19.14_660ns_33.205-33.255_0.png"
     main()
-else:
-    print("color_filter.py imported")
\ No newline at end of file
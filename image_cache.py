@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+小型的影像解碼快取 (LRU)：以「路徑 + 修改時間」為鍵，同一張影像在 ROI 選取與顏色濾鏡之間只解碼一次。
+
+- 回傳的陣列為共用的快取內容，需要在上面繪圖時請先 `.copy()`。
+
+---
+
+Small LRU cache of decoded images, keyed by path and mtime, so that an image is decoded only once across
+ROI selection and color filtering.
+
+- The returned arrays are the shared cached objects; `.copy()` them before drawing on them.
+"""
+import os
+from collections import OrderedDict
+
+import cv2 as cv
+
+import instrumentation as instr
+
+
+# cv.imread 可解碼的常見影像副檔名，用於從資料夾中挑出影像
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp')
+
+class ImageCache():
+    def __init__(self, max_images=4):
+        self.max_images = max_images   # 最多保留的影像數
+        self.__images = OrderedDict()  # (路徑, 修改時間, 是否轉為三通道) -> 影像
+
+    def read(self, path, color=False):
+        """
+        Decode an image, or return it from the cache if the file has not changed.
+
+        Parameters:
+        path (str): Path of the image.
+        color (bool): If True, return a 3-channel BGR image, as `cv.imread(path)`;
+            otherwise return it unchanged, as `cv.imread(path, cv.IMREAD_UNCHANGED)`.
+
+        Returns:
+        numpy.ndarray
+        """
+        key = (os.path.abspath(path), os.stat(path).st_mtime_ns, color)
+        if key in self.__images:
+            self.__images.move_to_end(key)
+            return self.__images[key]
+
+        if color:
+            # 由未轉換的解碼結果轉為三通道，避免再解碼一次
+            img = self.read(path, color=False)
+            if img.dtype != 'uint8':
+                img = cv.imread(path)
+                if img is None:
+                    raise FileNotFoundError(f"Cannot decode image: {path}")
+            elif img.ndim == 2:
+                img = cv.cvtColor(img, cv.COLOR_GRAY2BGR)
+            elif img.shape[2] == 4:
+                img = cv.cvtColor(img, cv.COLOR_BGRA2BGR)
+        else:
+            with instr.stage('imread'):
+                img = cv.imread(path, cv.IMREAD_UNCHANGED)
+            instr.count('bytes_read', os.path.getsize(path))
+            if img is None:
+                raise FileNotFoundError(f"Cannot decode image: {path}")
+
+        self.__images[key] = img
+        while len(self.__images) > self.max_images:
+            self.__images.popitem(last=False)
+        return img
+
+    def clear(self):
+        self.__images.clear()
+
+
+# 模組共用的快取
+default_cache = ImageCache()
+
+
+def read_image(img, color=False):
+    """
+    Accept either a path or an already-decoded image.
+
+    Parameters:
+    img (str or numpy.ndarray): Path of the image, or the decoded image itself (returned as is).
+    color (bool): See `ImageCache.read`.
+
+    Returns:
+    numpy.ndarray
+    """
+    if isinstance(img, (str, os.PathLike)):
+        return default_cache.read(os.fspath(img), color)
+    return img
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+輕量的分段計時與計數：找出實際執行時時間花在哪裡 (讀檔、顏色濾鏡、ROI 遮罩、寫檔、基線統計、門檻、繪圖...)。
+
+- 預設關閉；關閉時 `stage()` 回傳共用的空 context manager，`timed` 裝飾的函式只多一次旗標判斷，幾乎沒有額外成本。
+- 以環境變數 `MS_PROFILE=<JSON-lines 路徑>` 開啟 (process pool 的子行程也會繼承)，或呼叫 `enable(path)`；
+  批次工具另有 `--profile <路徑>` 參數。
+- 每個檔案一筆 JSON-lines 記錄 (各階段秒數與計數器)，結束時以 `print_summary()` 列出每個階段的 p50/p95。
+- 記錄檔以附加模式寫入，每筆記錄帶有本次執行的 `run` 識別碼，彙總時以 `read_records(path, run_id())` 只取本次的記錄。
+
+---
+
+Lightweight per-stage timers and counters, to find where the time goes in production runs (reading, color
+filtering, ROI masking, writing, baseline statistics, thresholding, drawing...).
+
+- Off by default; when off, `stage()` returns a shared no-op context manager and `timed` functions only test a
+  flag, so the overhead is near zero.
+- Enabled with the environment variable `MS_PROFILE=<JSON-lines path>` (inherited by process pool workers),
+  or with `enable(path)`; the batch tools also take `--profile <path>`.
+- One JSON-lines record per file (seconds per stage and counters), and `print_summary()` lists the p50/p95 of
+  every stage at the end of a run.
+- The output is appended to, and every record carries the `run` id of its run, so that
+  `read_records(path, run_id())` summarizes the current run only.
+"""
+import os
+import json
+import time
+import uuid
+import functools
+from contextlib import nullcontext
+from collections import defaultdict, Counter
+
+import numpy as np
+
+
+_NULL = nullcontext()
+_enabled = False
+_output = None                  # JSON-lines 路徑；None 時只在記憶體中統計
+_stages = defaultdict(list)     # 階段名稱 -> 每次呼叫的秒數 (本行程)
+_counters = Counter()           # 計數器名稱 -> 總數 (本行程)
+_record = None                  # 目前檔案的記錄 {'file', 'stages', 'counters'}
+_run = None                     # 本次執行的識別碼；子行程經由環境變數 MS_PROFILE_RUN 繼承
+
+
+def enable(output=None):
+    """
+    Turn the instrumentation on.
+
+    Parameters:
+    output (str): JSON-lines file the per-file records are appended to; optional. It is also exported as
+        `MS_PROFILE`, so that worker processes started afterwards are instrumented too.
+
+    Returns:
+    None
+    """
+    global _enabled, _output, _run
+    _enabled, _output = True, output
+    # 子行程沿用父行程的識別碼，同一次執行的記錄才能一起彙總
+    _run = os.environ.get('MS_PROFILE_RUN') or uuid.uuid4().hex[:12]
+    os.environ['MS_PROFILE_RUN'] = _run
+    if output:
+        os.environ['MS_PROFILE'] = output
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def run_id():
+    """
+    Id of the current run, written into every record; None when never enabled.
+
+    Returns:
+    str
+    """
+    return _run
+
+
+def reset():
+    """
+    Forget the timings and counters gathered so far in this process.
+    """
+    _stages.clear()
+    _counters.clear()
+
+
+class _Stage():
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        _stages[self.name].append(seconds)
+        if _record is not None:
+            _record['stages'][self.name] = _record['stages'].get(self.name, 0.0) + seconds
+
+
+def stage(name):
+    """
+    Time a block: `with stage('imread'): ...`.
+
+    Returns:
+    context manager
+    """
+    return _Stage(name) if _enabled else _NULL
+
+
+def timed(name):
+    """
+    Decorator timing every call of a function as the stage `name`.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    """
+    Add `n` to the counter `name` (e.g. bytes read, artists created).
+    """
+    if _enabled:
+        _counters[name] += n
+        if _record is not None:
+            _record['counters'][name] = _record['counters'].get(name, 0) + n
+
+
+class _FileRecord():
+    __slots__ = ('file', 'start')
+
+    def __init__(self, file):
+        self.file = file
+
+    def __enter__(self):
+        global _record
+        _record = {'file': self.file, 'stages': {}, 'counters': {}}
+        self.start = time.perf_counter()
+        return _record
+
+    def __exit__(self, *exc):
+        global _record
+        record, _record = _record, None
+        record['seconds'] = time.perf_counter() - self.start
+        record['pid'] = os.getpid()
+        record['run'] = _run
+        if _output:
+            # 一行一筆，以附加模式寫入；各個 process 的記錄可寫入同一個檔案
+            with open(_output, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+
+
+def file_record(file):
+    """
+    Gather the stages and counters of one input file into one record: `with file_record(name): ...`.
+    The record is appended to the JSON-lines output when the block ends.
+
+    Returns:
+    context manager
+    """
+    return _FileRecord(os.path.basename(file)) if _enabled else _NULL
+
+
+def watch_figure(fig):
+    """
+    Time every render of a matplotlib figure as the stage 'draw' (`draw_idle()` only schedules the render).
+
+    Returns:
+    fig
+    """
+    if _enabled:
+        fig.draw = timed('draw')(fig.draw)
+    return fig
+
+
+def read_records(path, run=None):
+    """
+    Read the per-file records of a JSON-lines output.
+
+    Parameters:
+    path (str): JSON-lines output.
+    run (str): Only the records of this run (e.g. `run_id()`); all records by default.
+
+    Returns:
+    list
+    """
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return records if run is None else [record for record in records if record.get('run') == run]
+
+
+def summary(records=None):
+    """
+    Count, total, p50 and p95 seconds of every stage.
+
+    Parameters:
+    records (list): Per-file records (see `read_records`); the stages are then summed per file. By default,
+        the individual calls timed in this process.
+
+    Returns:
+    dict: Stage name -> {'n', 'total', 'p50', 'p95'}; the counters of the records (or of this process) are under
+    the key 'counters'.
+    """
+    if records is None:
+        samples, counters = _stages, dict(_counters)
+    else:
+        samples, counters = defaultdict(list), Counter()
+        for record in records:
+            samples['file'].append(record['seconds'])
+            for name, seconds in record['stages'].items():
+                samples[name].append(seconds)
+            counters.update(record['counters'])
+
+    result = {}
+    for name, values in samples.items():
+        values = np.asarray(values)
+        result[name] = {'n': len(values), 'total': float(values.sum()),
+                        'p50': float(np.percentile(values, 50)), 'p95': float(np.percentile(values, 95))}
+    result['counters'] = dict(counters)
+    return result
+
+
+def print_summary(records=None):
+    """
+    Print `summary(records)` as a table, slowest stage (by total) first. Does nothing when off.
+
+    Returns:
+    None
+    """
+    if not _enabled:
+        return
+    result = summary(records)
+    counters = result.pop('counters')
+    print(f"{'stage':<16}{'n':>8}{'total s':>12}{'p50 ms':>12}{'p95 ms':>12}")
+    for name, row in sorted(result.items(), key=lambda item: -item[1]['total']):
+        print(f"{name:<16}{row['n']:>8}{row['total']:>12.3f}{row['p50'] * 1000:>12.2f}{row['p95'] * 1000:>12.2f}")
+    for name, value in sorted(counters.items()):
+        print(f"{name:<16}{value:>20}")
+
+
+if os.environ.get('MS_PROFILE'):
+    enable(os.environ['MS_PROFILE'])
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+可縮放波形的多層次細節 (level-of-detail) 繪圖：每條波形建立一次「最小/最大值金字塔」，
+每次縮放或平移時，只將可見範圍內、符合螢幕解析度的資料點交給單一 Line2D。
+
+- 金字塔第 k 層的每個區塊涵蓋 2**k 個取樣點，並保存區塊內的最小值與最大值，
+  因此即使是只有一個取樣點寬的窄訊號峰，在任何縮放倍率下都不會消失。
+- `LODBars` 以同樣的方式取代對整條波形的 `ax.bar()`：只畫可見範圍內、抽樣後各點的長條 (單一 `PolyCollection`)。
+
+---
+
+Level-of-detail rendering for zoomable traces: a min/max decimation pyramid is built once per trace,
+and on each zoom/pan only the visible window, at screen resolution, is fed into a single Line2D.
+
+- Each bucket of level k covers 2**k samples and keeps their minimum and maximum,
+  so even a spike one sample wide stays visible at any zoom level.
+- `LODBars` replaces `ax.bar()` over the whole trace the same way: only the bars of the decimated points of
+  the visible window are drawn (one `PolyCollection`).
+"""
+import numpy as np
+from matplotlib.collections import PolyCollection
+
+import instrumentation as instr
+
+
+class MinMaxPyramid():
+    def __init__(self, micro_sec, mini_volts):
+        self.micro_sec = np.asarray(micro_sec)   # 時間軸 (需單調遞增)
+        self.mini_volts = np.asarray(mini_volts) # 原始電壓
+        self.mins = [self.mini_volts]            # 各層區塊的最小值；第 0 層即原始資料
+        self.maxs = [self.mini_volts]            # 各層區塊的最大值
+
+        # 每層將上一層相鄰兩個區塊合併，直到只剩一個區塊
+        while len(self.mins[-1]) > 1:
+            self.mins.append(self.__pairwise(self.mins[-1], np.minimum))
+            self.maxs.append(self.__pairwise(self.maxs[-1], np.maximum))
+
+    @staticmethod
+    def __pairwise(values, reduce):
+        """
+        Reduce each pair of neighbouring buckets; an odd last bucket is kept as is.
+
+        Returns:
+        numpy.ndarray
+        """
+        even = len(values) - len(values) % 2
+        merged = reduce(values[0:even:2], values[1:even:2])
+        if even < len(values):
+            merged = np.append(merged, values[-1])
+        return merged
+
+    def range_minmax(self, i0, i1):
+        """
+        Minimum and maximum of the samples [i0, i1), from O(log n) buckets of the pyramid.
+
+        Returns:
+        tuple: (minimum, maximum); (NaN, NaN) for an empty range.
+        """
+        lows, highs = [], []
+        level = 0
+        # 由最細的一層往上：範圍兩端落單的區塊直接取用，其餘交給上一層
+        while i0 < i1:
+            if i0 & 1:
+                lows.append(self.mins[level][i0])
+                highs.append(self.maxs[level][i0])
+                i0 += 1
+            if i1 & 1:
+                i1 -= 1
+                lows.append(self.mins[level][i1])
+                highs.append(self.maxs[level][i1])
+            i0, i1, level = i0 >> 1, i1 >> 1, level + 1
+        if not lows:
+            return np.nan, np.nan
+        return min(lows), max(highs)
+
+    def query(self, x_min, x_max, n_pixels):
+        """
+        Decimated points of the window [x_min, x_max] for a plot `n_pixels` wide.
+
+        The window is located with a binary search on the time axis; the level is chosen so that
+        there are about one or two buckets per pixel column, and each bucket contributes its
+        minimum and its maximum.
+
+        Parameters:
+        x_min (float): Left edge of the visible window.
+        x_max (float): Right edge of the visible window.
+        n_pixels (int): Width of the plot in pixels.
+
+        Returns:
+        tuple: (x, y) arrays, at most about 4 * n_pixels points long.
+        """
+        # 多取左右各一點，讓線段延伸到視窗邊緣
+        i0 = max(np.searchsorted(self.micro_sec, x_min, side='left') - 1, 0)
+        i1 = min(np.searchsorted(self.micro_sec, x_max, side='right') + 1, len(self.micro_sec))
+        n_pixels = max(int(n_pixels), 1)
+        count = i1 - i0
+
+        # 可見點數不多時直接回傳原始資料 (零複製的 view)
+        if count <= 2 * n_pixels:
+            return self.micro_sec[i0:i1], self.mini_volts[i0:i1]
+
+        level = min(int(np.log2(count / n_pixels)), len(self.mins) - 1)
+        b0 = i0 >> level
+        b1 = ((i1 - 1) >> level) + 1
+
+        # 每個區塊以其起點時間，依序繪出最小值與最大值
+        x = np.repeat(self.micro_sec[np.arange(b0, b1) << level], 2)
+        y = np.empty(2 * (b1 - b0), dtype=self.mini_volts.dtype)
+        y[0::2] = self.mins[level][b0:b1]
+        y[1::2] = self.maxs[level][b0:b1]
+        return x, y
+
+
+class LODLine():
+    def __init__(self, ax, pyramid, **kwargs):
+        self.ax = ax                 # 所屬的 Axes
+        self.pyramid = pyramid       # 共用的 MinMaxPyramid
+        x, y = pyramid.query(pyramid.micro_sec[0], pyramid.micro_sec[-1], ax.bbox.width)
+        self.line, = ax.plot(x, y, **kwargs)
+        instr.count('artists')
+        # 每當 x 軸範圍改變 (縮放、平移) 就更新線段資料；ax.clear() 會一併移除此回呼。
+        # 回呼只以弱參照保存 bound method，呼叫端必須保留此物件的參照，否則被回收後縮放不再更新
+        ax.callbacks.connect('xlim_changed', self.refresh)
+
+    def refresh(self, ax=None):
+        """
+        Feed the currently visible window at screen resolution into the line.
+
+        Parameters:
+        ax (matplotlib.axes.Axes): Passed by the `xlim_changed` callback; unused.
+
+        Returns:
+        None
+        """
+        with instr.stage('lod_refresh'):
+            x_min, x_max = self.ax.get_xlim()
+            x, y = self.pyramid.query(x_min, x_max, self.ax.bbox.width)
+            self.line.set_data(x, y)
+        instr.count('points_drawn', len(x))
+
+
+class LODBars():
+    def __init__(self, ax, pyramid, width=0.8, color='C0'):
+        self.ax = ax                 # 所屬的 Axes
+        self.pyramid = pyramid       # 共用的 MinMaxPyramid
+        self.width = width           # 長條寬度，與 ax.bar(width=...) 相同
+        self.bars = PolyCollection(self.__verts(pyramid.micro_sec[0], pyramid.micro_sec[-1]), facecolors=color, edgecolors='none')
+        ax.add_collection(self.bars)
+        ax.autoscale_view()
+        instr.count('artists')
+        ax.callbacks.connect('xlim_changed', self.refresh)  # 同 LODLine：呼叫端必須保留此物件的參照
+
+    def __verts(self, x_min, x_max):
+        """
+        Rectangles from 0 to each decimated point of the window; bars overlapping the edges are included.
+        Each bucket contributes the bars of its minimum and maximum, whose union covers all its bars.
+
+        Returns:
+        numpy.ndarray: Array of shape (n, 4, 2).
+        """
+        x, y = self.pyramid.query(x_min - self.width / 2, x_max + self.width / 2, self.ax.bbox.width)
+        verts = np.zeros((len(x), 4, 2))
+        verts[:, 0:2, 0] = (x - self.width / 2)[:, None]
+        verts[:, 2:4, 0] = (x + self.width / 2)[:, None]
+        verts[:, 1:3, 1] = np.asarray(y)[:, None]
+        return verts
+
+    def refresh(self, ax=None):
+        """
+        Feed the bars of the currently visible window into the collection.
+
+        Parameters:
+        ax (matplotlib.axes.Axes): Passed by the `xlim_changed` callback; unused.
+
+        Returns:
+        None
+        """
+        with instr.stage('lod_refresh'):
+            verts = self.__verts(*self.ax.get_xlim())
+            self.bars.set_verts(verts)
+        instr.count('points_drawn', len(verts))
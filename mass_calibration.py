@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+TOF 質量校正與質譜重新分箱 (rebinning)：由已知的參考峰擬合飛行時間與質荷比的關係
+`t = t0 + k * sqrt(m/z)`，整條波形以一次向量化運算轉為 m/z，再累加到共用的 m/z 網格上。
+
+- 每條波形在網格上的強度以 `np.bincount` 一次累加 (保留積分強度)，寫入預先配置的二維陣列的一列，
+  因此不同設定 (例如 `..._20k_19.14_660ns_...`) 的上千條質譜可以直接以一個 (質譜數, 分箱數) 陣列相加或比較。
+- 用法：`python mass_calibration.py ./MS_data/ --ref 1.24 18.01 --ref 2.51 44.00 --bin-width 0.1`
+
+---
+
+TOF mass calibration and spectrum rebinning: the relation between flight time and mass-to-charge ratio,
+`t = t0 + k * sqrt(m/z)`, is fitted from known reference peaks, whole traces are converted to m/z in one
+vectorized call, and accumulated onto a shared m/z grid.
+
+- The intensity of each trace is accumulated onto the grid with one `np.bincount` (which preserves the
+  integrated intensity) into one row of a preallocated 2D array, so thousands of spectra taken with
+  different settings (e.g. `..._20k_19.14_660ns_...`) can be summed or compared as one
+  (spectra, bins) array.
+- Usage: `python mass_calibration.py ./MS_data/ --ref 1.24 18.01 --ref 2.51 44.00 --bin-width 0.1`
+"""
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+
+from trace_stats import TraceStats
+from ms_data_loader import load_ms_data
+
+
+class MassCalibration():
+    def __init__(self, t0, k):
+        self.t0 = float(t0)   # 零質量時的飛行時間 (μs)
+        self.k = float(k)     # 每單位 sqrt(m/z) 的飛行時間 (μs)
+
+    @classmethod
+    def fit(cls, times, masses):
+        """
+        Least-squares fit of `t = t0 + k * sqrt(m/z)` to reference peaks.
+
+        Parameters:
+        times (array-like): Flight times of the reference peaks (μs), e.g. `peaks['time']`.
+        masses (array-like): Their known m/z.
+
+        Returns:
+        MassCalibration
+
+        Raises:
+        ValueError: Fewer than two peaks, or a fit where the flight time does not increase with m/z (k <= 0).
+        """
+        times = np.asarray(times, dtype=np.float64)
+        masses = np.asarray(masses, dtype=np.float64)
+        if len(times) != len(masses) or len(times) < 2:
+            raise ValueError("at least two (time, m/z) reference peaks are required")
+        k, t0 = np.polyfit(np.sqrt(masses), times, 1)
+        if not k > 0:
+            raise ValueError(f"the flight time must increase with m/z, but the fitted k is {k:.6g}; check the reference peaks")
+        return cls(t0, k)
+
+    def to_mz(self, micro_sec):
+        """
+        Convert flight times to m/z in one vectorized call; times before `t0` give NaN.
+
+        Returns:
+        numpy.ndarray: Same shape as `micro_sec` (0-d for a scalar).
+        """
+        micro_sec = np.asarray(micro_sec, dtype=np.float64)
+        reduced = np.atleast_1d((micro_sec - self.t0) / self.k)  # 純量也能以遮罩賦值
+        mz = np.square(reduced)
+        mz[reduced < 0] = np.nan
+        return mz.reshape(micro_sec.shape)
+
+    def to_time(self, mz):
+        """
+        Flight times of the given m/z.
+
+        Returns:
+        numpy.ndarray
+        """
+        return self.t0 + self.k * np.sqrt(np.asarray(mz, dtype=np.float64))
+
+    def residuals(self, times, masses):
+        """
+        m/z error of the reference peaks after calibration (calibrated - known).
+
+        Returns:
+        numpy.ndarray
+        """
+        return self.to_mz(times) - np.asarray(masses, dtype=np.float64)
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'t0': self.t0, 'k': self.k}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(**json.load(f))
+
+
+class MzGrid():
+    def __init__(self, mz_min, mz_max, bin_width):
+        if not mz_max > mz_min:  # 亦排除 NaN
+            raise ValueError(f"the m/z grid needs mz_max > mz_min, but got mz_min = {mz_min:.6g}, mz_max = {mz_max:.6g}")
+        self.mz_min = float(mz_min)                                          # 網格下限
+        self.bin_width = float(bin_width)                                    # 分箱寬度
+        self.size = int(np.ceil((mz_max - mz_min) / bin_width))              # 分箱數
+        self.edges = self.mz_min + np.arange(self.size + 1) * self.bin_width # 分箱邊界
+        self.centers = self.edges[:-1] + self.bin_width / 2                  # 分箱中心
+
+    def bin_indices(self, mz):
+        """
+        Bin of every m/z value, and the mask of the values inside the grid.
+
+        Returns:
+        tuple: (indices, inside)
+        """
+        position = (mz - self.mz_min) / self.bin_width
+        inside = (position >= 0) & (position < self.size)  # NaN 兩者皆為 False
+        return position[inside].astype(np.int64), inside
+
+
+class SpectrumStack():
+    def __init__(self, grid, capacity=64):
+        self.grid = grid                                        # 共用的 MzGrid
+        self.count = 0                                          # 已加入的質譜數
+        self.names = []                                         # 各列的名稱 (例如檔名)
+        self.__spectra = np.zeros((capacity, grid.size))        # 預先配置的 (容量, 分箱數) 陣列
+
+    @property
+    def spectra(self):
+        """
+        The (spectra, bins) array of the spectra added so far (a view, not a copy).
+        """
+        return self.__spectra[:self.count]
+
+    def add(self, micro_sec, intensity, calibration, name=None):
+        """
+        Convert one trace to m/z and accumulate its intensity onto the grid, as a new row.
+
+        Parameters:
+        micro_sec (array-like): Time axis of the trace.
+        intensity (array-like): Intensity of the trace, e.g. `mini_volts - baseline`.
+        calibration (MassCalibration): Calibration of the run the trace belongs to.
+        name (str): Name of the row; optional.
+
+        Returns:
+        int: Row of the spectrum.
+        """
+        if self.count == len(self.__spectra):
+            # 容量不足時加倍，已加入的列只複製一次
+            grown = np.zeros((2 * len(self.__spectra), self.grid.size))
+            grown[:self.count] = self.__spectra[:self.count]
+            self.__spectra = grown
+
+        indices, inside = self.grid.bin_indices(calibration.to_mz(micro_sec))
+        row = self.count
+        self.__spectra[row] = np.bincount(indices, weights=np.asarray(intensity, dtype=np.float64)[inside], minlength=self.grid.size)
+        self.names.append(name)
+        self.count += 1
+        return row
+
+    def sum(self):
+        """
+        Summed spectrum of all rows.
+
+        Returns:
+        numpy.ndarray
+        """
+        return self.spectra.sum(axis=0)
+
+    def save(self, path):
+        """
+        Save the m/z bin centers, the spectra and their names as a `.npz` file.
+
+        Returns:
+        None
+        """
+        np.savez(path, mz=self.grid.centers, spectra=self.spectra, names=np.array(self.names, dtype=str))
+
+
+def stack_files(file_list, calibration, grid, subtract_baseline=True):
+    """
+    Rebin many .data files onto one m/z grid.
+
+    Parameters:
+    file_list (list): Paths of the .data files.
+    calibration (MassCalibration or dict): One calibration for all files, or file path -> calibration.
+    grid (MzGrid): Shared m/z grid.
+    subtract_baseline (bool): Subtract the noise baseline (mode) of each trace before accumulating.
+
+    Returns:
+    SpectrumStack
+    """
+    stack = SpectrumStack(grid, capacity=max(len(file_list), 1))
+    for file in file_list:
+        micro_sec, mini_volts = load_ms_data(file)
+        intensity = np.asarray(mini_volts, dtype=np.float64)
+        if subtract_baseline:
+            intensity = intensity - TraceStats(mini_volts).baseline
+        file_calibration = calibration[file] if isinstance(calibration, dict) else calibration
+        stack.add(micro_sec, intensity, file_calibration, os.path.basename(file))
+    return stack
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate TOF traces to m/z and rebin them onto a shared grid.")
+    parser.add_argument('input_dir', nargs='?', default="./MS_data/", help="folder of the .data files")
+    parser.add_argument('--ref', type=float, nargs=2, action='append', metavar=('TIME', 'MZ'),
+                        help="reference peak: flight time (μs) and known m/z; at least two")
+    parser.add_argument('--calibration', default=None, help="calibration JSON saved by MassCalibration.save, instead of --ref")
+    parser.add_argument('--mz-min', type=float, default=1.0, help="lower edge of the m/z grid")
+    parser.add_argument('--mz-max', type=float, default=None, help="upper edge of the m/z grid; defaults to the m/z at --record-us")
+    parser.add_argument('--record-us', type=float, default=None,
+                        help="end of the time axis of the traces (μs), for the default --mz-max; defaults to that of the first file")
+    parser.add_argument('--bin-width', type=float, default=0.1, help="width of the m/z bins")
+    parser.add_argument('--output', default=None, help='defaults to "./spectra_<current time>.npz"')
+    args = parser.parse_args()
+
+    if args.calibration:
+        calibration = MassCalibration.load(args.calibration)
+    elif args.ref and len(args.ref) >= 2:
+        times, masses = np.array(args.ref).T
+        try:
+            calibration = MassCalibration.fit(times, masses)
+        except ValueError as error:
+            parser.error(str(error))
+        print(f"t0 = {calibration.t0:.6f} μs, k = {calibration.k:.6f} μs, residuals (m/z) = {np.round(calibration.residuals(times, masses), 4)}")
+    else:
+        parser.error("two --ref peaks or --calibration are required")
+
+    file_list = [os.path.join(args.input_dir, file) for file in sorted(os.listdir(args.input_dir))
+                 if file.endswith(".data") and os.path.isfile(os.path.join(args.input_dir, file))]
+    if not file_list:
+        parser.error(f"no .data files in {args.input_dir}")
+    if args.mz_max is None:
+        # 由校正與紀錄長度推得，不必為了範圍讀入每個檔案；超出網格的部分不會累加
+        record_us = args.record_us if args.record_us is not None else load_ms_data(file_list[0])[0][-1]
+        args.mz_max = float(calibration.to_mz(record_us)) + args.bin_width
+        if np.isnan(args.mz_max):
+            parser.error(f"the record ends at {record_us:.6g} μs, before t0 = {calibration.t0:.6g} μs; give --mz-max")
+    try:
+        grid = MzGrid(args.mz_min, args.mz_max, args.bin_width)
+    except ValueError as error:
+        parser.error(str(error))
+    output = args.output or "./spectra_" + time.strftime("%Y%m%d_%H%M%S") + ".npz"
+
+    start = time.perf_counter()
+    stack = stack_files(file_list, calibration, grid)
+    stack.save(output)
+    print(f"{stack.count} spectra × {stack.grid.size} bins in {time.perf_counter() - start:.3f} s, written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+TOF-MS 原始資料的無介面批次處理：對資料夾下的每個 .data 檔案，以固定的訊雜比 (signal ratio) 偵測訊號，
+並輸出標記圖 (PNG)，整批的訊號峰則寫成一個表格 (CSV 或 Parquet)；以 process pool 平行處理，並回報每個檔案的耗時。
+
+- 用法：`python ms_batch.py ./MS_data/ --signal-ratio 0.95 --output-dir ./outputs/ --workers 8 --table-format parquet`
+
+---
+
+Headless batch processing of TOF-MS raw data: for every .data file in a folder, signals are detected with a
+fixed signal ratio, the labeled figure (PNG) is written, and the peaks of the whole batch go into one table
+(CSV or Parquet); files are processed in parallel by a process pool, and the time spent on each file is reported.
+
+- Usage: `python ms_batch.py ./MS_data/ --signal-ratio 0.95 --output-dir ./outputs/ --workers 8 --table-format parquet`
+"""
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib as mpl
+mpl.use('Agg')  # 無視窗的繪圖後端
+import matplotlib.pyplot as plt
+
+import instrumentation as instr
+import peak_detector as pkd
+import peak_table as pkt
+from trace_stats import TraceStats
+from ms_data_loader import load_ms_data
+from lod_renderer import MinMaxPyramid, LODLine
+
+
+def process_file(file, signal_ratio, output_dir):
+    """
+    Detect the signals of one .data file, write its PNG and build its peak table.
+
+    Parameters:
+    file (str): Path of the .data file.
+    signal_ratio (float): Same meaning as the plotters' signal ratio / SNR slider.
+    output_dir (str): Folder of the outputs.
+
+    Returns:
+    tuple: (record, table); `record` holds the file name, the number of peaks and the seconds spent on
+    each stage, `table` is the `peak_table.build_peak_table` output.
+    """
+    name = os.path.basename(file)
+    timings = {}
+
+    with instr.file_record(file):
+        # 讀取檔案
+        start = time.perf_counter()
+        micro_sec, mini_volts = load_ms_data(file)
+        timings['load'] = time.perf_counter() - start
+
+        # 計算統計量並偵測訊號
+        start = time.perf_counter()
+        stats = TraceStats(mini_volts)
+        max_noise = stats.max_noise(signal_ratio)
+        peaks = pkd.detect_peaks(micro_sec, mini_volts, max_noise, baseline=stats.baseline, above=stats.indices_above(max_noise))
+        timings['detect'] = time.perf_counter() - start
+
+        # 繪製標記圖
+        start = time.perf_counter()
+        fig, ax = plt.subplots(figsize=(10, 4))
+        fig.suptitle(name)
+        LODLine(ax, MinMaxPyramid(micro_sec, mini_volts), lw=1)
+        ax.axhline(y=stats.baseline, color='red')                    # baseline
+        ax.axhline(y=max_noise, color='#FE9900', linestyle='--')     # max_noise line
+        ax.plot(peaks['time'], peaks['height'], marker='*', color='red', linestyle='')
+        ax.set_title('Labeled')
+        with instr.stage('savefig'):
+            fig.savefig(os.path.join(output_dir, name.replace(".data", ".png")))
+        plt.close(fig)
+        timings['png'] = time.perf_counter() - start
+
+        # 整理訊號峰列表
+        start = time.perf_counter()
+        table = pkt.build_peak_table(name, peaks, micro_sec, stats.baseline, stats.noise_sigma)
+        timings['table'] = time.perf_counter() - start
+
+        timings['total'] = sum(timings.values())
+        return {'file': name, 'peaks': len(peaks), **timings}, table
+
+
+def run_batch(input_dir, signal_ratio, output_dir, workers=None, table_format="csv", file_list=None):
+    """
+    Process every .data file of `input_dir` with a process pool; a file that fails is reported and skipped.
+
+    Parameters:
+    input_dir (str): Folder of the .data files.
+    signal_ratio (float): Signal ratio used for every file.
+    output_dir (str): Folder of the outputs; created if missing.
+    workers (int): Number of processes; defaults to the number of CPUs.
+    table_format (str): "csv" or "parquet"; the peaks of the batch are written to `peaks.<table_format>`.
+    file_list (list): Files to process instead of every file of `input_dir`, e.g. from `acquisition_catalog.select_files`.
+
+    Returns:
+    list: One timing record per file (see `process_file`), in completion order; the record of a failed file
+    only holds 'file' and 'error'.
+    """
+    if file_list is None:
+        # 只處理 .data 一般檔案，略過子資料夾、說明文件與先前的輸出
+        file_list = [os.path.join(input_dir, file) for file in sorted(os.listdir(input_dir))
+                     if file.endswith(".data") and os.path.isfile(os.path.join(input_dir, file))]
+    os.makedirs(output_dir, exist_ok=True)
+
+    records = []
+    tables = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_file, file, signal_ratio, output_dir): file for file in file_list}
+        for future in as_completed(futures):
+            try:
+                record, table = future.result()
+            except Exception as error:
+                # 單一檔案失敗不中斷整批，記錄錯誤後繼續
+                record = {'file': os.path.basename(futures[future]), 'error': f"{type(error).__name__}: {error}"}
+                records.append(record)
+                print(f"{record['file']}: failed, {record['error']}")
+                continue
+            records.append(record)
+            tables[futures[future]] = table
+            print(f"{record['file']}: {record['peaks']} peaks, "
+                  f"load {record['load']:.3f} s, detect {record['detect']:.3f} s, "
+                  f"png {record['png']:.3f} s, table {record['table']:.3f} s, total {record['total']:.3f} s")
+
+    # 整批的訊號峰依檔名順序一次寫入
+    pkt.write_peak_tables([tables[file] for file in file_list if file in tables], pkt.peak_table_path(output_dir, table_format))
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless batch mode of the MS plotters.")
+    parser.add_argument('input_dir', nargs='?', default="./MS_data/", help="folder of the .data files")
+    parser.add_argument('--signal-ratio', type=float, default=0.95, help="signal ratio / SNR slider value")
+    parser.add_argument('--output-dir', default=None, help='defaults to "./outputs_<current time>/"')
+    parser.add_argument('--workers', type=int, default=None, help="number of processes")
+    parser.add_argument('--table-format', choices=["csv", "parquet"], default="csv", help="format of the peak table")
+    parser.add_argument('--profile', default=None, help="append per-file stage timings to this JSON-lines file")
+    parser.add_argument('--select', nargs='+', default=None, metavar='COLUMN=VALUE',
+                        help="only the files whose name settings match, e.g. delay_ns=660 mcp_kv=2.1 (see acquisition_catalog.py)")
+    parser.add_argument('--catalog', default=None, help="SQLite index used by --select; defaults to ./.ms_catalog.sqlite")
+    args = parser.parse_args()
+    if args.profile:
+        instr.enable(args.profile)  # 在建立 process pool 之前開啟，子行程經由環境變數繼承
+
+    # 預設建立 "./outputs_當前時間/" 資料夾
+    output_dir = args.output_dir or "./outputs_" + time.strftime("%Y%m%d_%H%M%S") + "/"
+
+    file_list = None
+    if args.select:
+        from acquisition_catalog import DEFAULT_CATALOG, select_files
+        file_list = select_files(args.input_dir, args.select, args.catalog or DEFAULT_CATALOG, extension=".data")
+        print(f"{len(file_list)} files match {' '.join(args.select)}")
+
+    start = time.perf_counter()
+    records = run_batch(args.input_dir, args.signal_ratio, output_dir, args.workers, args.table_format, file_list)
+    failed = sum('error' in record for record in records)
+    print(f"{len(records)} files in {time.perf_counter() - start:.3f} s" + (f", {failed} failed" if failed else ""))
+    profile = os.environ.get('MS_PROFILE')
+    if profile and os.path.exists(profile):
+        instr.print_summary(instr.read_records(profile, instr.run_id()))  # 只彙總本次執行的記錄
+
+
+if __name__ == "__main__":
+    main()
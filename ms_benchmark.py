@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+TOF-MS 處理流程的效能測試：產生與 `./MS_data/` 相同格式 (空白分隔兩欄) 的合成波形，
+以無視窗方式量測各階段 (讀檔、基線/眾數、門檻、偵測、繪圖) 的耗時，並附上 git commit，
+寫成 JSON-lines，方便比較不同 commit 的結果。
+
+- 用法：
+    1. `python ms_benchmark.py --samples 10000 1000000 --peak-density 0.001 --noise 0.01`
+    2. `python ms_benchmark.py --compare` (比較 `bench_results.jsonl` 中的歷次結果)
+
+---
+
+Benchmark of the TOF-MS pipeline: synthetic traces in the same format as `./MS_data/` (space-separated
+two columns) are generated, the time of each stage (loading, baseline/mode, threshold, detection, rendering)
+is measured headlessly, and the results are written as JSON lines together with the git commit, so runs
+on different commits can be compared.
+
+- Usage:
+    1. `python ms_benchmark.py --samples 10000 1000000 --peak-density 0.001 --noise 0.01`
+    2. `python ms_benchmark.py --compare` (compare the runs stored in `bench_results.jsonl`)
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+import matplotlib as mpl
+mpl.use('Agg')  # 無視窗的繪圖後端
+import matplotlib.pyplot as plt
+
+import peak_detector as pkd
+from trace_stats import TraceStats
+from ms_data_loader import load_ms_data
+from lod_renderer import MinMaxPyramid, LODLine
+
+
+def make_synthetic_trace(samples, peak_density=0.001, noise=0.01, sample_period=0.00025, seed=0):
+    """
+    Generate a synthetic TOF-MS trace: quantized Gaussian noise plus narrow Gaussian peaks.
+
+    Parameters:
+    samples (int): Number of samples.
+    peak_density (float): Expected number of peaks per sample.
+    noise (float): Standard deviation of the noise.
+    sample_period (float): Time between samples, in micro seconds.
+    seed (int): Seed of the random generator.
+
+    Returns:
+    tuple: (micro_sec, mini_volts)
+    """
+    rng = np.random.default_rng(seed)
+    micro_sec = np.arange(samples) * sample_period
+    mini_volts = rng.normal(0, noise, samples)
+
+    # 每個訊號峰為數個取樣點寬的高斯峰
+    n_peaks = rng.poisson(peak_density * samples)
+    centers = rng.integers(0, samples, n_peaks)
+    heights = rng.uniform(5 * noise, 100 * noise, n_peaks)
+    for offset in range(-3, 4):
+        index = np.clip(centers + offset, 0, samples - 1)
+        np.add.at(mini_volts, index, heights * np.exp(-offset ** 2 / 2))
+
+    # 如同示波器，電壓量化到 1 mV
+    return micro_sec, np.round(mini_volts, 3)
+
+
+def write_synthetic_file(file, micro_sec, mini_volts, chunk_size=1_000_000):
+    """
+    Write a trace in the space-separated two-column .data format, chunk by chunk.
+
+    Returns:
+    None
+    """
+    with open(file, 'w') as f:
+        for start in range(0, len(micro_sec), chunk_size):
+            np.savetxt(f, np.column_stack((micro_sec[start:start + chunk_size], mini_volts[start:start + chunk_size])), fmt='%.6f %.3f')
+
+
+def timed(function, repeat=3):
+    """
+    Best time of `repeat` calls of `function`, and its last result.
+
+    Returns:
+    tuple: (seconds, result)
+    """
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark_file(file, signal_ratio=0.95, repeat=3):
+    """
+    Time every stage of the pipeline on one .data file.
+
+    The original pandas paths of the plotters are timed next to the current ones.
+
+    Parameters:
+    file (str): Path of the .data file.
+    signal_ratio (float): Signal ratio used for the threshold.
+    repeat (int): Number of runs of each stage; the best is kept.
+
+    Returns:
+    dict: Seconds per stage.
+    """
+    result = {}
+    # 快取放在暫存資料夾，任何階段發生例外時也會一併刪除
+    with tempfile.TemporaryDirectory(prefix="ms_benchmark_cache_") as cache_dir:
+        # 讀檔
+        result['load_read_csv'], data = timed(lambda: pd.read_csv(file, sep=' ', header=None), repeat)
+        result['load_parse'], _ = timed(lambda: load_ms_data(file, use_cache=False), repeat)
+        result['load_cache_cold'], _ = timed(lambda: load_ms_data(file, cache_dir=cache_dir), 1)
+        result['load_cache_warm'], (micro_sec, mini_volts) = timed(lambda: load_ms_data(file, cache_dir=cache_dir), repeat)
+
+        # 基線與門檻
+        data.columns = ['micro_sec', 'mini_volts']
+        result['stats_pandas_mode'], baseline = timed(lambda: data['mini_volts'].mode().iloc[0], repeat)
+        result['stats_trace_stats'], stats = timed(lambda: TraceStats(mini_volts), repeat)
+        max_noise = stats.max_noise(signal_ratio)
+        result['threshold_pandas'], _ = timed(lambda: data[data['mini_volts'] > max_noise]['micro_sec'], repeat)
+        result['threshold_sorted'], signal_idx = timed(lambda: stats.indices_above(max_noise), repeat)
+
+        # 偵測
+        result['detect_peaks'], peaks = timed(lambda: pkd.detect_peaks(micro_sec, mini_volts, max_noise, above=signal_idx), repeat)
+        result['peaks'] = len(peaks)
+
+        # 繪圖 (Agg)
+        def render(lod):
+            fig, ax = plt.subplots()
+            if lod:
+                LODLine(ax, MinMaxPyramid(micro_sec, mini_volts), lw=1)
+            else:
+                ax.plot(micro_sec, mini_volts, lw=1)
+            fig.canvas.draw()
+            plt.close(fig)
+        result['render_full'], _ = timed(lambda: render(False), repeat)
+        result['render_lod'], _ = timed(lambda: render(True), repeat)
+
+    return result
+
+
+def git_commit():
+    """
+    Current git commit of the repository, or None outside a git checkout.
+
+    Returns:
+    str
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(output):
+    """
+    Print the stored runs as one table: one row per (commit, samples), one column per stage.
+
+    Returns:
+    None
+    """
+    with open(output) as f:
+        runs = pd.DataFrame([json.loads(line) for line in f if line.strip()])
+    stages = [column for column in runs.columns if column.startswith(('load_', 'stats_', 'threshold_', 'detect_', 'render_'))]
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(runs.groupby(['commit', 'samples'], sort=False)[stages].min())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the TOF-MS pipeline on synthetic traces.")
+    parser.add_argument('--samples', type=int, nargs='+', default=[10 ** 4, 10 ** 5, 10 ** 6], help="trace lengths (10^4 to 10^8)")
+    parser.add_argument('--peak-density', type=float, default=0.001, help="expected peaks per sample")
+    parser.add_argument('--noise', type=float, default=0.01, help="standard deviation of the noise")
+    parser.add_argument('--signal-ratio', type=float, default=0.95, help="signal ratio / SNR slider value")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per stage; the best is kept")
+    parser.add_argument('--output', default="./bench_results.jsonl", help="JSON-lines file the results are appended to")
+    parser.add_argument('--compare', action='store_true', help="only print the stored results")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.output)
+        return
+
+    commit = git_commit()
+    with tempfile.TemporaryDirectory(prefix="ms_benchmark_") as work_dir:
+        for samples in args.samples:
+            # 產生合成波形
+            file = os.path.join(work_dir, f"synthetic_{samples}.data")
+            write_synthetic_file(file, *make_synthetic_trace(samples, args.peak_density, args.noise))
+
+            result = {'commit': commit, 'time': time.strftime("%Y-%m-%d %H:%M:%S"), 'samples': samples,
+                      'peak_density': args.peak_density, 'noise': args.noise,
+                      **benchmark_file(file, args.signal_ratio, args.repeat)}
+            print(json.dumps(result))
+            with open(args.output, 'a') as f:
+                f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+TOF-MS 訊號峰偵測引擎：以 NumPy 陣列一次計算門檻遮罩，並將連續超過門檻的取樣點合併為「事件」。
+
+- 每個事件包含：
+    1. 起點 (start)、峰頂 (apex)、終點 (end) 的取樣索引
+    2. 峰頂時間 (time) 與峰高 (height)
+    3. 面積 (area)，即超出基線部分對時間的積分
+
+---
+
+Peak detection engine for TOF-MS traces: the threshold mask is computed in bulk on NumPy arrays,
+and consecutive samples above the threshold are grouped into "events".
+
+- Each event holds:
+    1. sample indices of the start, apex and end (inclusive)
+    2. apex time and height
+    3. area, i.e. the integral of the part above the baseline over time
+"""
+import numpy as np
+
+import instrumentation as instr
+
+
+# 事件的結構化陣列格式
+PEAK_DTYPE = np.dtype([
+    ('start', np.int64),
+    ('apex', np.int64),
+    ('end', np.int64),
+    ('time', np.float64),
+    ('height', np.float64),
+    ('area', np.float64),
+])
+
+
+@instr.timed('detect_peaks')
+def detect_peaks(micro_sec, mini_volts, threshold, baseline=None, above=None):
+    """
+    Detect the events whose voltage is above `threshold`.
+
+    All work is vectorized: one pass builds the mask, and the per-event apex and area
+    are obtained with `np.maximum.reduceat` / `np.add.reduceat` over the samples above threshold.
+
+    Parameters:
+    micro_sec (array-like): Time axis of the trace (monotonic).
+    mini_volts (array-like): Voltage of the trace.
+    threshold (float): Samples strictly above this value belong to an event (i.e. `max_noise`).
+    baseline (float): Reference level for the area; defaults to `threshold`.
+    above (numpy.ndarray): Time-ordered indices of the samples above `threshold`, if already known
+        (e.g. from `TraceStats.indices_above`); skips the O(n) mask.
+
+    Returns:
+    numpy.ndarray: Structured array of dtype `PEAK_DTYPE`, one row per event, ordered in time.
+    """
+    micro_sec = np.asarray(micro_sec, dtype=np.float64)
+    mini_volts = np.asarray(mini_volts)
+    if baseline is None:
+        baseline = threshold
+    if above is None:
+        above = np.flatnonzero(mini_volts > threshold)
+
+    if len(above) == 0:
+        return np.empty(0, dtype=PEAK_DTYPE)
+
+    # 索引不連續處即為事件的分界；之後的運算皆為 O(k)
+    breaks = np.flatnonzero(np.diff(above) != 1) + 1
+    offsets = np.concatenate(([0], breaks))
+    lengths = np.diff(np.append(offsets, len(above)))
+    starts = above[offsets]
+    ends = above[offsets + lengths - 1]
+    volts = mini_volts[above].astype(np.float64)
+    peaks = np.empty(len(starts), dtype=PEAK_DTYPE)
+
+    # 峰高與峰頂位置 (同高時取第一個)
+    heights = np.maximum.reduceat(volts, offsets)
+    is_apex = volts == np.repeat(heights, lengths)
+    segment_id = np.repeat(np.arange(len(starts)), lengths)
+    _, first = np.unique(segment_id[is_apex], return_index=True)
+    apex = above[np.flatnonzero(is_apex)[first]]
+
+    # 每個取樣點所代表的時間寬度 (中央差分；端點取單側)
+    last = len(micro_sec) - 1
+    dt = (micro_sec[np.minimum(above + 1, last)] - micro_sec[np.maximum(above - 1, 0)]) / 2
+    dt[(above == 0) | (above == last)] *= 2
+
+    peaks['start'] = starts
+    peaks['apex'] = apex
+    peaks['end'] = ends
+    peaks['time'] = micro_sec[apex]
+    peaks['height'] = heights
+    peaks['area'] = np.add.reduceat((volts - baseline) * dt, offsets)
+    return peaks
+
+
+def noise_threshold(max_volts, baseline, signal_ratio):
+    """
+    Compute `max_noise` as used by the plotters' signal ratio / SNR slider.
+
+    Parameters:
+    max_volts (float): Maximum voltage of the trace.
+    baseline (float): Noise baseline (mode of the voltages).
+    signal_ratio (float): Slider value in (0, 1].
+
+    Returns:
+    float: The threshold above which samples are regarded as signals.
+    """
+    return max_volts - (max_volts - baseline) * signal_ratio
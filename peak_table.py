@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+訊號峰列表的輸出與讀取：將每個檔案偵測到的訊號峰整理成表格 (時間、峰高、寬度、面積、訊雜比、檔名)，
+整批 (batch) 一次寫成一個欄式檔案 (CSV 或 Parquet)；之後彙整上千次量測時，只需一次讀取，不必重新偵測。
+
+- Parquet 需額外安裝 `pyarrow` (或 `fastparquet`)，CSV 則不需要。
+
+---
+
+Export and reading of peak tables: the peaks detected in each file are arranged as a table (time, height,
+width, area, SNR, file id), and a whole batch is written at once as one columnar file (CSV or Parquet);
+aggregating thousands of runs is then a single read instead of re-running detection.
+
+- Parquet needs `pyarrow` (or `fastparquet`) installed; CSV does not.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+
+PEAK_TABLE_COLUMNS = ['file', 'time', 'height', 'width', 'area', 'snr', 'start', 'end']
+
+
+def build_peak_table(file, peaks, micro_sec, baseline, noise_sigma):
+    """
+    Arrange the peaks of one file as a table.
+
+    Parameters:
+    file (str): File id, usually the name of the .data file.
+    peaks (numpy.ndarray): Output of `peak_detector.detect_peaks`.
+    micro_sec (numpy.ndarray): Time axis of the trace.
+    baseline (float): Noise baseline of the trace.
+    noise_sigma (float): Noise standard deviation of the trace; the SNR column is NaN if it is 0.
+
+    Returns:
+    pandas.DataFrame: One row per peak, with the columns of `PEAK_TABLE_COLUMNS`.
+    """
+    micro_sec = np.asarray(micro_sec)
+    # 取樣間隔；寬度為事件從第一點到最後一點所涵蓋的時間
+    dt = (micro_sec[-1] - micro_sec[0]) / (len(micro_sec) - 1) if len(micro_sec) > 1 else 0.0
+    # 雜訊標準差為 0 (例如定值波形) 時訊雜比沒有意義，明確寫入 NaN 而非 inf
+    if noise_sigma > 0:
+        snr = (peaks['height'] - baseline) / noise_sigma
+    else:
+        snr = np.full(len(peaks), np.nan)
+
+    return pd.DataFrame({
+        'file': pd.Categorical([file] * len(peaks)),
+        'time': peaks['time'],
+        'height': peaks['height'],
+        'width': micro_sec[peaks['end']] - micro_sec[peaks['start']] + dt,
+        'area': peaks['area'],
+        'snr': snr,
+        'start': peaks['start'],
+        'end': peaks['end'],
+    }, columns=PEAK_TABLE_COLUMNS)
+
+
+def write_peak_tables(tables, path):
+    """
+    Write the tables of a batch as one file; the format follows the extension (.csv or .parquet).
+
+    Parameters:
+    tables (list): `build_peak_table` outputs.
+    path (str): Output path.
+
+    Returns:
+    pandas.DataFrame: The concatenated table.
+    """
+    table = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=PEAK_TABLE_COLUMNS)
+    table['file'] = table['file'].astype('category')
+
+    if path.endswith(".parquet"):
+        table.to_parquet(path, index=False)
+    elif path.endswith(".csv"):
+        table.to_csv(path, index=False)
+    else:
+        raise ValueError(f"Unknown peak table format: {path}")
+    return table
+
+
+def read_peak_tables(paths):
+    """
+    Read many batch files back as one table.
+
+    Parameters:
+    paths (list): Paths of .csv and/or .parquet peak tables.
+
+    Returns:
+    pandas.DataFrame
+    """
+    tables = []
+    for path in paths:
+        if path.endswith(".parquet"):
+            tables.append(pd.read_parquet(path))
+        else:
+            tables.append(pd.read_csv(path, dtype={'file': 'category'}))
+    return pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=PEAK_TABLE_COLUMNS)
+
+
+def peak_table_path(output_dir, table_format="csv"):
+    """
+    Default path of the peak table of a batch, in its output folder.
+
+    Returns:
+    str
+    """
+    return os.path.join(output_dir, f"peaks.{table_format}")
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+`signal_detector_in_roi.py` 的無介面批次處理：ROI 不再以滑鼠選取，而是從檔案讀入
+(每張影像各一個 `<影像檔名>.json` / `.csv`，或所有影像共用一個範本)，
+再以預設的 BGR 顏色濾鏡與 ROI 取交集；以 process pool 平行處理並輸出結果影像，不開啟任何視窗。
+
+- ROI 檔案格式與 `selecting_roi_frame.save_frame_list` 相同；互動模式 (`signal_detector_in_roi.py`)
+  會將每張影像選取的 ROI 存在輸出資料夾，可直接作為本程式的 `--roi-dir`。
+- 用法：`python roi_batch.py ./images/ --roi-dir ./rois/` 或 `python roi_batch.py ./images/ --roi-template roi.json`
+
+---
+
+Headless batch mode of `signal_detector_in_roi.py`: the ROIs are not selected with the mouse but read from
+files (one `<image name>.json` / `.csv` per image, or one shared template), and intersected with the default
+BGR color filter; images are processed by a process pool and the outputs written without any window.
+
+- The ROI file format is the one of `selecting_roi_frame.save_frame_list`; the interactive mode
+  (`signal_detector_in_roi.py`) saves the ROIs of every image in its output folder, which can be used as
+  `--roi-dir` here.
+- Usage: `python roi_batch.py ./images/ --roi-dir ./rois/` or `python roi_batch.py ./images/ --roi-template roi.json`
+"""
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2 as cv
+
+import instrumentation as instr
+import selecting_roi_frame as srf
+from image_cache import IMAGE_EXTENSIONS, read_image
+from roi_statistics import write_roi_stats
+from spot_extractor import write_spots
+from signal_detector_in_roi import signal_in_roi
+
+
+def process_image(img, frame_list, output_dir):
+    """
+    Apply the ROI frames and the default color filter to one image and write the result.
+
+    Parameters:
+    img (str): Path of the image.
+    frame_list (list): Reorganized ROI frames.
+    output_dir (str): Folder of the outputs.
+
+    Returns:
+    tuple: (record, table, spots); `record` holds the image name, the number of signal pixels and spots in the
+    ROIs and the seconds spent, `table` is the per-ROI statistics (`roi_statistics.ROI_STATS_DTYPE`), `spots`
+    the per-spot table (`spot_extractor.SPOT_DTYPE`).
+    """
+    start = time.perf_counter()
+    with instr.file_record(img):
+        decoded = read_image(img)  # 只解碼一次，顏色濾鏡直接使用解碼後的影像
+        return_img = read_image(img, color=True).copy()
+
+        # 如同互動模式，以綠色畫出 ROI frame
+        for frame in frame_list:
+            cv.rectangle(return_img, tuple(frame[0]), tuple(frame[1]), (0, 255, 0), 1)
+
+        return_img, table, spots = signal_in_roi(decoded, frame_list, return_img)
+        with instr.stage('imwrite'):
+            cv.imwrite(os.path.join(output_dir, os.path.basename(img)), return_img)
+    record = {'img': os.path.basename(img), 'signal_pixels': int(table['pixels'].sum()), 'spots': len(spots),
+              'seconds': time.perf_counter() - start}
+    return record, table, spots
+
+
+def list_images(input_dir):
+    """
+    Image files of a folder, by name; subfolders, ROI files and other documents are left out.
+
+    Returns:
+    list
+    """
+    return [os.path.join(input_dir, img) for img in sorted(os.listdir(input_dir))
+            if img.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(os.path.join(input_dir, img))]
+
+
+def init_worker():
+    # 每個 process 只用一個 OpenCV 執行緒，避免與 process pool 互搶核心
+    cv.setNumThreads(1)
+
+
+def run_batch(img_list, output_dir, roi_dir=None, roi_template=None, workers=None):
+    """
+    Process the images with a process pool; an image that fails is reported and skipped.
+
+    Parameters:
+    img_list (list): Paths of the images.
+    output_dir (str): Folder of the outputs; created if missing.
+    roi_dir (str): Folder of the per-image ROI files; takes precedence over `roi_template`.
+    roi_template (str): ROI file shared by the images without their own ROI file.
+    workers (int): Number of processes; defaults to the number of CPUs.
+
+    Returns:
+    list: One record per processed image (see `process_image`); images without ROIs are skipped, and the
+    record of a failed image only holds 'img' and 'error'.
+    The per-ROI statistics and the spots of all images are written to `roi_stats.csv` and `spots.csv` in
+    `output_dir`.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    template = srf.load_frame_list(roi_template) if roi_template else None
+
+    jobs = []
+    for img in img_list:
+        roi_file = srf.find_frame_file(img, roi_dir) if roi_dir else None
+        frame_list = srf.load_frame_list(roi_file) if roi_file else template
+        if frame_list is None:
+            print(f"{os.path.basename(img)}: no ROI file, skipped")
+            continue
+        jobs.append((img, frame_list))
+
+    records = []
+    tables = {}
+    spot_tables = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        futures = {pool.submit(process_image, img, frame_list, output_dir): img for img, frame_list in jobs}
+        for future in as_completed(futures):
+            try:
+                record, table, spots = future.result()
+            except Exception as error:
+                # 單一影像失敗 (例如無法解碼) 不中斷整批，記錄錯誤後繼續
+                record = {'img': os.path.basename(futures[future]), 'error': f"{type(error).__name__}: {error}"}
+                records.append(record)
+                print(f"{record['img']}: failed, {record['error']}")
+                continue
+            records.append(record)
+            tables[record['img']] = table
+            spot_tables[record['img']] = spots
+            print(f"{record['img']}: {record['signal_pixels']} signal pixels, {record['spots']} spots, {record['seconds']:.3f} s")
+
+    # 所有影像的 ROI 統計量與光點依檔名順序各寫成一個表格
+    names = [os.path.basename(img) for img, _ in jobs if os.path.basename(img) in tables]
+    write_roi_stats(os.path.join(output_dir, "roi_stats.csv"), [(name, tables[name]) for name in names])
+    write_spots(os.path.join(output_dir, "spots.csv"), [(name, spot_tables[name]) for name in names])
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless batch mode of signal_detector_in_roi.py.")
+    parser.add_argument('input_dir', nargs='?', default="./images/", help="folder of the images")
+    parser.add_argument('--roi-dir', default=None, help="folder of <image name>.json / .csv ROI files")
+    parser.add_argument('--roi-template', default=None, help="ROI file shared by all images")
+    parser.add_argument('--output-dir', default=None, help='defaults to "./outputs_<current time>/"')
+    parser.add_argument('--workers', type=int, default=None, help="number of processes")
+    parser.add_argument('--profile', default=None, help="append per-image stage timings to this JSON-lines file")
+    parser.add_argument('--select', nargs='+', default=None, metavar='COLUMN=VALUE',
+                        help="only the images whose name settings match, e.g. delay_ns=388 mcp_kv=2.1 (see acquisition_catalog.py)")
+    parser.add_argument('--catalog', default=None, help="SQLite index used by --select; defaults to ./.ms_catalog.sqlite")
+    args = parser.parse_args()
+    if not args.roi_dir and not args.roi_template:
+        parser.error("one of --roi-dir or --roi-template is required")
+    if args.profile:
+        instr.enable(args.profile)  # 在建立 process pool 之前開啟，子行程經由環境變數繼承
+
+    # 預設建立 "./outputs_當前時間/" 資料夾
+    output_dir = args.output_dir or "./outputs_" + time.strftime("%Y%m%d_%H%M%S") + "/"
+    if args.select:
+        from acquisition_catalog import DEFAULT_CATALOG, select_files
+        img_list = [img for img in select_files(args.input_dir, args.select, args.catalog or DEFAULT_CATALOG)
+                    if img.lower().endswith(IMAGE_EXTENSIONS)]
+        print(f"{len(img_list)} images match {' '.join(args.select)}")
+    else:
+        img_list = list_images(args.input_dir)
+
+    start = time.perf_counter()
+    records = run_batch(img_list, output_dir, args.roi_dir, args.roi_template, args.workers)
+    failed = sum('error' in record for record in records)
+    print(f"{len(records)} images in {time.perf_counter() - start:.3f} s" + (f", {failed} failed" if failed else ""))
+    profile = os.environ.get('MS_PROFILE')
+    if profile and os.path.exists(profile):
+        instr.print_summary(instr.read_records(profile, instr.run_id()))  # 只彙總本次執行的記錄
+
+
+if __name__ == "__main__":
+    main()
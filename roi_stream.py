@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+ROI 訊號偵測的串流模式：從影片或編號的影像序列逐幀讀取，以固定的 ROI 與預先建立的顏色濾鏡處理每一幀，
+輸出每一幀、每個 ROI 的訊號像素數 (與光點數) 時間序列。
+
+- 解碼在背景執行緒進行，透過有上限的預讀佇列 (prefetch queue) 交給處理端；OpenCV 的解碼與 `inRange`
+  皆會釋放 GIL，因此解碼與處理會重疊，吞吐量取決於兩者中較慢的一方，記憶體用量則受佇列長度限制。
+- 只對 ROI 範圍內的像素做顏色分類，不建立整張的遮罩。
+- 用法：`python roi_stream.py run.mp4 --roi roi.json` 或 `python roi_stream.py ./frames/ --roi roi.json --spots`
+
+---
+
+Streaming mode of the ROI signal detector: frames are read one by one from a video or a numbered image
+sequence, each frame is processed with fixed ROIs and a precomputed color filter, and the signal pixel (and
+spot) count of every ROI in every frame is emitted as a time series.
+
+- Decoding runs on a background thread and hands the frames over through a bounded prefetch queue; OpenCV
+  releases the GIL while decoding and in `inRange`, so decoding and processing overlap, the throughput is the
+  one of the slower of the two, and the memory use is bounded by the queue length.
+- Only the pixels inside the ROIs are classified; no full-frame mask is built.
+- Usage: `python roi_stream.py run.mp4 --roi roi.json` or `python roi_stream.py ./frames/ --roi roi.json --spots`
+"""
+import os
+import re
+import csv
+import glob
+import time
+import queue
+import argparse
+import threading
+
+import numpy as np
+import cv2 as cv
+
+import selecting_roi_frame as srf
+import color_filter as cf
+from image_cache import IMAGE_EXTENSIONS
+
+
+def sequence_files(source):
+    """
+    Image files of a numbered image sequence, in numeric order ("frame_2.png" before "frame_10.png");
+    other files (ROI files, notes, ...) and folders are left out.
+
+    Parameters:
+    source (str): Folder of the images, or a glob pattern such as "./frames/*.png".
+
+    Returns:
+    list
+    """
+    files = glob.glob(os.path.join(source, "*")) if os.path.isdir(source) else glob.glob(source)
+    files = [file for file in files if file.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(file)]
+    return sorted(files, key=lambda file: [int(s) if s.isdigit() else s for s in re.split(r'(\d+)', os.path.basename(file))])
+
+
+def iter_frames(source):
+    """
+    Decode the frames of a video file or of a numbered image sequence.
+
+    Parameters:
+    source (str): Path of a video, folder of images, or glob pattern of images.
+
+    Returns:
+    generator: Yields (frame index, time in ms, BGR frame); the time is NaN for an image sequence, whose
+    undecodable files are skipped without taking a frame index.
+    """
+    if os.path.isdir(source) or glob.has_magic(source):
+        index = 0
+        for file in sequence_files(source):
+            frame = cv.imread(file)
+            if frame is not None:
+                yield index, np.nan, frame
+                index += 1
+        return
+
+    capture = cv.VideoCapture(source)
+    if not capture.isOpened():
+        raise IOError(f"cannot open {source}")
+    try:
+        index = 0
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield index, capture.get(cv.CAP_PROP_POS_MSEC), frame
+            index += 1
+    finally:
+        capture.release()
+
+
+class PrefetchReader():
+    __END = object()
+
+    def __init__(self, frames, max_frames=8):
+        """
+        Run a frame generator on a background thread, buffering at most `max_frames` decoded frames.
+
+        Parameters:
+        frames (iterable): e.g. `iter_frames(source)`.
+        max_frames (int): Length of the prefetch queue.
+        """
+        self.__queue = queue.Queue(maxsize=max_frames)
+        self.__stop = threading.Event()
+        self.__thread = threading.Thread(target=self.__decode, args=(frames,), daemon=True)
+        self.__thread.start()
+
+    def __decode(self, frames):
+        try:
+            for item in frames:
+                if not self.__put(item):
+                    return
+        except Exception as error:  # 解碼錯誤交給處理端的執行緒拋出
+            self.__put(error)
+        self.__put(self.__END)
+
+    def __put(self, item):
+        # 佇列已滿時等待，但在 close() 之後放棄
+        while not self.__stop.is_set():
+            try:
+                self.__queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def __iter__(self):
+        while True:
+            item = self.__queue.get()
+            if item is self.__END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def close(self):
+        """
+        Stop the background thread.
+
+        Returns:
+        None
+        """
+        self.__stop.set()
+        self.__thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RoiCounter():
+    def __init__(self, frame_list, classifier=cf.default_classifier, class_name='signal'):
+        """
+        Precompute the ROI slices and the color filter applied to every frame.
+
+        Parameters:
+        frame_list (list): Reorganized ROI frames as [[start_x, start_y], [end_x, end_y]].
+        classifier (color_classifier.ColorClassifier): Precompiled color filter; the default BGR filter by default.
+        class_name (str): Class of `classifier` counted as signal.
+        """
+        self.frame_list = frame_list
+        self.classifier = classifier
+        self.class_name = class_name
+
+    def count(self, frame, count_spots=False):
+        """
+        Signal pixels (and spots) of every ROI in one frame.
+
+        Parameters:
+        frame (numpy.ndarray): BGR frame.
+        count_spots (bool): If True, also count the connected components of each ROI.
+
+        Returns:
+        tuple: (pixels, spots) arrays of length len(frame_list); `spots` is None unless `count_spots`.
+        """
+        height, width = frame.shape[:2]
+        pixels = np.zeros(len(self.frame_list), dtype=np.int64)
+        spots = np.zeros(len(self.frame_list), dtype=np.int64) if count_spots else None
+        for roi, frame_xy in enumerate(self.frame_list):
+            x0, x1 = np.clip([frame_xy[0][0], frame_xy[1][0]], 0, width)
+            y0, y1 = np.clip([frame_xy[0][1], frame_xy[1][1]], 0, height)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            mask = self.classifier.mask(frame[y0:y1, x0:x1], self.class_name)
+            pixels[roi] = cv.countNonZero(mask)
+            if count_spots and pixels[roi]:
+                spots[roi] = cv.connectedComponents(mask, connectivity=8)[0] - 1  # 扣除背景
+        return pixels, spots
+
+
+def stream_roi_counts(source, frame_list, count_spots=False, prefetch=8, counter=None):
+    """
+    Per-frame, per-ROI signal counts of a video or image sequence, with decoding overlapped with processing.
+
+    Parameters:
+    source (str): Path of a video, folder of images, or glob pattern of images.
+    frame_list (list): Reorganized ROI frames, fixed for the whole stream.
+    count_spots (bool): If True, also count the spots of each ROI.
+    prefetch (int): Number of decoded frames buffered ahead of the processing.
+    counter (RoiCounter): Filter to apply; defaults to `RoiCounter(frame_list)`.
+
+    Returns:
+    generator: Yields (frame index, time in ms, pixels, spots) per frame, see `RoiCounter.count`.
+    """
+    counter = counter or RoiCounter(frame_list)
+    with PrefetchReader(iter_frames(source), prefetch) as reader:
+        for index, time_ms, frame in reader:
+            yield (index, time_ms, *counter.count(frame, count_spots))
+
+
+def roi_time_series(source, frame_list, count_spots=False, prefetch=8):
+    """
+    Collect `stream_roi_counts` into arrays.
+
+    Returns:
+    dict: 'frame' and 'time_ms' of shape (n_frames,), 'pixels' (and 'spots' if `count_spots`) of shape
+    (n_frames, n_rois).
+    """
+    frames, times, pixels, spots = [], [], [], []
+    for index, time_ms, frame_pixels, frame_spots in stream_roi_counts(source, frame_list, count_spots, prefetch):
+        frames.append(index)
+        times.append(time_ms)
+        pixels.append(frame_pixels)
+        spots.append(frame_spots)
+
+    series = {
+        'frame': np.array(frames, dtype=np.int64),
+        'time_ms': np.array(times, dtype=np.float64),
+        'pixels': np.array(pixels, dtype=np.int64).reshape(len(frames), len(frame_list)),
+    }
+    if count_spots:
+        series['spots'] = np.array(spots, dtype=np.int64).reshape(len(frames), len(frame_list))
+    return series
+
+
+def write_time_series(path, series):
+    """
+    Write a `roi_time_series` output as a CSV, one row per frame and ROI.
+
+    Parameters:
+    path (str): Output path.
+    series (dict): Output of `roi_time_series`.
+
+    Returns:
+    None
+    """
+    n_frames, n_rois = series['pixels'].shape
+    columns = ['frame', 'time_ms', 'roi', 'pixels'] + (['spots'] if 'spots' in series else [])
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for i in range(n_frames):
+            for roi in range(n_rois):
+                row = [series['frame'][i], series['time_ms'][i], roi, series['pixels'][i, roi]]
+                if 'spots' in series:
+                    row.append(series['spots'][i, roi])
+                writer.writerow(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming ROI signal counts of a video or image sequence.")
+    parser.add_argument('source', help="video file, folder of images, or glob pattern of images")
+    parser.add_argument('--roi', required=True, help="ROI file (.json / .csv), see selecting_roi_frame.save_frame_list")
+    parser.add_argument('--output', default=None, help='defaults to "./roi_counts_<current time>.csv"')
+    parser.add_argument('--spots', action='store_true', help="also count the spots of each ROI")
+    parser.add_argument('--prefetch', type=int, default=8, help="number of decoded frames buffered ahead")
+    args = parser.parse_args()
+
+    output = args.output or "./roi_counts_" + time.strftime("%Y%m%d_%H%M%S") + ".csv"
+    frame_list = srf.load_frame_list(args.roi)
+
+    start = time.perf_counter()
+    series = roi_time_series(args.source, frame_list, args.spots, args.prefetch)
+    seconds = time.perf_counter() - start
+    write_time_series(output, series)
+    print(f"{len(series['frame'])} frames in {seconds:.3f} s ({len(series['frame']) / max(seconds, 1e-9):.1f} fps), written to {output}")
+
+
+if __name__ == "__main__":
+    main()
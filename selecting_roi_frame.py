@@ -1,19 +1,101 @@
 # -*- coding: utf-8 -*-
 """ """
 
+import os
+import csv
+import json
+
 import cv2 as cv
 
+from image_cache import read_image
+
+
+def reorganize_frames(frame_list):
+    """
+    Ensure that the starting coordinates of every frame are less than the ending coordinates (in place).
+
+    Parameters:
+    frame_list (list): Frames as [[start_x, start_y], [end_x, end_y]].
+
+    Returns:
+    frame_list
+    """
+    for frame in frame_list:
+        if frame[0][0] > frame[1][0]:
+            frame[0][0], frame[1][0] = frame[1][0], frame[0][0]
+        if frame[0][1] > frame[1][1]:
+            frame[0][1], frame[1][1] = frame[1][1], frame[0][1]
+    return frame_list
+
+
+def save_frame_list(frame_list, path):
+    """
+    Save the ROI frames as JSON ([[[start_x, start_y], [end_x, end_y]], ...]) or CSV (x0,y0,x1,y1 per row),
+    according to the extension of `path`.
+
+    Parameters:
+    frame_list (list): Frames as returned by `ROISelector.roi_selector`.
+    path (str): Output path (.json or .csv).
+
+    Returns:
+    None
+    """
+    if path.endswith(".csv"):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['x0', 'y0', 'x1', 'y1'])
+            writer.writerows([[*start, *end] for start, end in frame_list])
+    else:
+        with open(path, 'w') as f:
+            json.dump(frame_list, f)
+
+
+def load_frame_list(path):
+    """
+    Load ROI frames saved by `save_frame_list`, already reorganized.
+
+    Parameters:
+    path (str): Path of a .json or .csv file.
+
+    Returns:
+    list: Frames as [[start_x, start_y], [end_x, end_y]].
+    """
+    if path.endswith(".csv"):
+        with open(path, newline='') as f:
+            rows = [row for row in csv.reader(f) if row and row[0] != 'x0']
+        frame_list = [[[int(x0), int(y0)], [int(x1), int(y1)]] for x0, y0, x1, y1 in rows]
+    else:
+        with open(path) as f:
+            frame_list = [[[int(v) for v in start], [int(v) for v in end]] for start, end in json.load(f)]
+    return reorganize_frames(frame_list)
+
+
+def find_frame_file(img, roi_dir):
+    """
+    Find the ROI file of an image in `roi_dir`: `<image name without extension>.json` or `.csv`.
+
+    Returns:
+    str: Path of the ROI file, or None if there is none.
+    """
+    stem = os.path.splitext(os.path.basename(img))[0]
+    for extension in (".json", ".csv"):
+        path = os.path.join(roi_dir, stem + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
 class ROISelector():
     def __init__(self, img):
-        self.__img = cv.imread(img)       # 原始影像；限傳入影像路徑
-        self.__img2 = self.__img.copy()   # 第一個繪圖層 ()
-        self.__img3 = self.__img2.copy()  # 第二個繪圖層 (用於顯示即時動畫)
+        self.__img = read_image(img, color=True)  # 原始影像；可傳入影像路徑 (經由快取解碼) 或已解碼的影像
+        self.__img2 = self.__img.copy()   # 唯一的繪圖層：最終的 ROI 矩形，以及即時動畫 (游標與橡皮筋矩形)
         self.__start_x = None             # 起始點的 x 座標
         self.__start_y = None             # 起始點的 y 座標
         self.__end_x = None               # 結束點的 x 座標
         self.__end_y = None               # 結束點的 y 座標
         self.frame_lists = []             # 儲存選取的 ROI 座標 (起點、終點)
         self.__drawing = False            # 是否正在繪製矩形
+        self.__dirty = []                 # 動畫蓋掉的像素條：[(y0, y1, x0, x1, 原本的像素)]，顯示後立即還原
 
     def select_roi_and_draw_frame(self, event, x, y, flags, param):
         """
@@ -36,8 +118,11 @@ class ROISelector():
         __start_y (int): The y-coordinate of the starting point of the rectangle.
         __end_x (int): The x-coordinate of the ending point of the rectangle.
         __end_y (int): The y-coordinate of the ending point of the rectangle.
-        __img2 (numpy.ndarray): The original image.
-        __img3 (numpy.ndarray): A copy of the original image used for drawing.
+        __img2 (numpy.ndarray): The drawing layer: a copy of the original image with the selected ROI frames,
+            on which the crosshair and rubber-band rectangle are animated.
+        __dirty (list): The pixel strips of __img2 covered by the last crosshair and rubber-band rectangle,
+            with their previous pixels; they are restored right after each frame is shown (`cv.imshow` copies
+            the image), so no second full-size layer is kept.
         frame_lists (list): A list of tuples containing the coordinates of the selected ROIs.
 
         Returns:
@@ -50,16 +135,20 @@ class ROISelector():
             print(f"Start from: ({self.__start_x}, {self.__start_y})")
         
         if event == cv.EVENT_MOUSEMOVE:               # 當滑鼠移動時
-            self.__img3 = self.__img2.copy()          # 複製第二個圖層，準備在第三圖層繪圖
-            cv.line(self.__img3, (x-10, y), (x+-1, y), (0, 0, 0), 1)  # 繪製游標十字，保留中心點為原始圖片之像素顏色
-            cv.line(self.__img3, (x+1, y), (x+10, y), (0, 0, 0), 1)   # 同上
-            cv.line(self.__img3, (x, y-10), (x, y-1), (0, 0, 0), 1)   # 同上
-            cv.line(self.__img3, (x, y+1), (x, y+10), (0, 0, 0), 1)   # 同上
-            cv.imshow('Please select the ROI (one or more); Then press "Enter" to finish.', self.__img3)  # 顯示繪製後的影像
-
+            strips = [(y, y+1, x-10, x+11), (y-10, y+11, x, x+1)]
             if self.__drawing:                        # 如果正在繪製矩形
-                cv.rectangle(self.__img3, (self.__start_x, self.__start_y), (x, y), (0, 0, 0), 1)  # 繪製矩形
-                cv.imshow('Please select the ROI (one or more); Then press "Enter" to finish.', self.__img3) # 顯示繪製後的影像
+                strips += self.__rectangle_strips(self.__start_x, self.__start_y, x, y)
+            self.__save_dirty(strips)                 # 繪圖前先保存會被蓋掉的像素
+
+            cv.line(self.__img2, (x-10, y), (x+-1, y), (0, 0, 0), 1)  # 繪製游標十字，保留中心點為原始圖片之像素顏色
+            cv.line(self.__img2, (x+1, y), (x+10, y), (0, 0, 0), 1)   # 同上
+            cv.line(self.__img2, (x, y-10), (x, y-1), (0, 0, 0), 1)   # 同上
+            cv.line(self.__img2, (x, y+1), (x, y+10), (0, 0, 0), 1)   # 同上
+            if self.__drawing:
+                cv.rectangle(self.__img2, (self.__start_x, self.__start_y), (x, y), (0, 0, 0), 1)  # 繪製矩形
+
+            cv.imshow('Please select the ROI (one or more); Then press "Enter" to finish.', self.__img2)  # 顯示繪製後的影像
+            self.__restore_dirty()                    # 顯示後立即移除動畫，繪圖層只保留最終的 ROI 矩形
 
         if event == cv.EVENT_LBUTTONUP:               # 當釋放滑鼠左鍵
             self.__drawing = False                    # 設定停止繪製矩形
@@ -67,12 +156,12 @@ class ROISelector():
             print(f"End at: ({self.__end_x}, {self.__end_y})")
             print(f"Height × Width: {abs(self.__end_y-self.__start_y)} × {abs(self.__end_x-self.__start_x)}")
             cv.rectangle(                             # 紀錄最終的 ROI 矩形，
-                self.__img2,                          # 於第一繪圖層
+                self.__img2,                          # 於繪圖層
                 (self.__start_x, self.__start_y), 
                 (self.__end_x, self.__end_y), 
                 (0, 255, 0), 1  
                 )
-            cv.imshow(                                # 顯示第一繪圖層的影像
+            cv.imshow(                                # 顯示繪圖層的影像
                 'Please select the ROI (one or more); Then press "Enter" to finish.', 
                 self.__img2
                 )
@@ -88,6 +177,33 @@ class ROISelector():
                 self.__start_x, self.__start_y, self.__end_x, self.__end_y = None, None, None, None
                 print(self.frame_lists)
         
+    def __save_dirty(self, strips):
+        """
+        Keep a copy of the pixels of __img2 under the given (y0, y1, x0, x1) strips (clipped to the image).
+        """
+        height, width = self.__img2.shape[:2]
+        for y0, y1, x0, x1 in strips:
+            y0, y1, x0, x1 = max(y0, 0), min(y1, height), max(x0, 0), min(x1, width)
+            if y0 < y1 and x0 < x1:
+                self.__dirty.append((y0, y1, x0, x1, self.__img2[y0:y1, x0:x1].copy()))
+
+    def __restore_dirty(self):
+        """
+        Put the pixels saved by __save_dirty back into __img2, in reverse order.
+        """
+        for y0, y1, x0, x1, pixels in reversed(self.__dirty):
+            self.__img2[y0:y1, x0:x1] = pixels
+        self.__dirty = []
+
+    @staticmethod
+    def __rectangle_strips(x0, y0, x1, y1):
+        """
+        The four one-pixel edges of a rectangle drawn with thickness 1, as (y0, y1, x0, x1) strips.
+        """
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        return [(y0, y0+1, x0, x1+1), (y1, y1+1, x0, x1+1), (y0, y1+1, x0, x0+1), (y0, y1+1, x1, x1+1)]
+
     def roi_selector(self, return_img=False):
         """
         This method displays the image in a window and sets a mouse callback to handle
@@ -134,17 +250,9 @@ class ROISelector():
         Returns:
         None
         """
-        for i, frame in enumerate(self.frame_lists):
-            if frame[0][0] > frame[1][0]:
-                self.frame_lists[i][0][0], self.frame_lists[i][1][0] = self.frame_lists[i][1][0], self.frame_lists[i][0][0]
-            if frame[0][1] > frame[1][1]:
-                self.frame_lists[i][0][1], self.frame_lists[i][1][1] = self.frame_lists[i][1][1], self.frame_lists[i][0][1]
-        
-        return self.frame_lists
+        return reorganize_frames(self.frame_lists)
 
 if __name__ == "__main__":  # 當此模組被當作主程式執行時
     img = "./images/392_20k_19.14_660ns_33.205-33.255_0.png"
     img_roi = ROISelector(img)
     img_roi.roi_selector()
-else:
-    print("selecting_roi_frame.py imported")  # 當此模組被當作模組引入時，印出此訊息
\ No newline at end of file
@@ -1,16 +1,54 @@
 import time
 import os
-import numpy as np
 import cv2 as cv
 
+import instrumentation as instr
 import selecting_roi_frame as srf
 import color_filter as cf
+from image_cache import read_image
+from roi_statistics import RoiIntegral, write_roi_stats
+from spot_extractor import extract_spots, write_spots
+
+def signal_in_roi(img, frame_list, return_img):
+    """
+    Paint the pixels of the default BGR color mask inside the ROI frames yellow, measure them per ROI, and
+    extract the signal spots (connected components) of each ROI.
+
+    Parameters:
+    img (str or numpy.ndarray): Path of the image, or the decoded image.
+    frame_list (list): Reorganized ROI frames as [[start_x, start_y], [end_x, end_y]].
+    return_img (numpy.ndarray): Image to paint on (modified in place).
+
+    Returns:
+    tuple: (return_img, table, spots); `table` is the per-ROI `roi_statistics.ROI_STATS_DTYPE` array, `spots`
+    the per-spot `spot_extractor.SPOT_DTYPE` array.
+    """
+    img = read_image(img)
+
+    # 取得根據預設值過濾後的 BGR 顏色遮罩
+    color_mask = cf.default_bgr_color_filter(img, return_result=False, return_mask=True)
+
+    # 只在每個 ROI 範圍內，將顏色遮罩的部分設為黃色 (不需建立整張的 ROI 遮罩)
+    with instr.stage('roi_mask'):
+        for frame in frame_list:
+            region = (slice(max(frame[0][1], 0), max(frame[1][1], 0)), slice(max(frame[0][0], 0), max(frame[1][0], 0)))
+            return_img[region][color_mask[region] == 255] = [0, 255, 255]
+
+    # 以積分影像計算每個 ROI 的像素數、質心與強度
+    with instr.stage('roi_stats'):
+        table = RoiIntegral(color_mask, img).stats(frame_list)
+
+    # 以連通區域標記取得每個 ROI 內的光點
+    with instr.stage('spots'):
+        spots = extract_spots(color_mask, frame_list, img)
+
+    return return_img, table, spots
 
 def main():
 
     # 取得 "./images/" 資料夾下的所有檔案名稱
     img_list = ["./images/" + img for img in os.listdir("./images/")]
-    
+
     # 建立 "./outputs_當前時間/" 資料夾
     local_time = time.strftime("%Y%m%d_%H%M%S")
     output_dir = "./outputs_" + local_time + "/"
@@ -23,26 +61,25 @@ def main():
         frame_list, return_img = img_roi.roi_selector(return_img=True)
         frame_list = img_roi.reorganize_frame_list()
 
-        # 取得根據預設值過濾後的 BGR 顏色遮罩
-        color_mask = cf.default_bgr_color_filter(img, return_result=False, return_mask=True)
-        
-        # 取得 ROI 遮罩
-        roi_mask = np.zeros_like(color_mask)
-        for frame in frame_list:
-            roi_mask[frame[0][1]:frame[1][1], frame[0][0]:frame[1][0]] = 255
-        
-        # 取得 ROI 遮罩與顏色遮罩的交集
-        mask = cv.bitwise_and(roi_mask, color_mask)
-
-        # 在 return_img 上，將 mask 部分的顏色設為黃色
-        return_img[mask == 255] = [0, 255, 255]
+        # 取得顏色遮罩與 ROI 的交集，並標示於 return_img 上 (影像已在 ROISelector 中解碼並快取，不會再解碼)
+        with instr.file_record(img):
+            return_img, table, spots = signal_in_roi(img, frame_list, return_img)
 
         # 顯示結果
         cv.imshow("Img of signal in ROI, press \"Enter\" to next.", return_img)
         cv.waitKey(0)
         cv.destroyAllWindows()
 
-        # 儲存結果於 "./outputs_當前時間/" 資料夾下
-        cv.imwrite(output_dir + img.split("/")[-1], return_img)
+        # 儲存結果於 "./outputs_當前時間/" 資料夾下；ROI 座標另存為 JSON，供 roi_batch.py 重複使用，
+        # 每個 ROI 的統計量與每個光點存為 CSV
+        with instr.stage('imwrite'):
+            cv.imwrite(output_dir + img.split("/")[-1], return_img)
+        srf.save_frame_list(frame_list, output_dir + os.path.splitext(img.split("/")[-1])[0] + ".json")
+        write_roi_stats(output_dir + os.path.splitext(img.split("/")[-1])[0] + "_roi_stats.csv", [(img.split("/")[-1], table)])
+        write_spots(output_dir + os.path.splitext(img.split("/")[-1])[0] + "_spots.csv", [(img.split("/")[-1], spots)])
+
+    # MS_PROFILE 開啟時，列出各階段的耗時
+    instr.print_summary()
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
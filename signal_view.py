@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+`simple_MS_data_plotter.py` 的圖表狀態：所有 artist 只建立一次，之後只就地更新資料與可見性，
+不再 `ax.clear()` 後重畫。
+
+- 擁有的 artist：
+    1. 原始波形 (`LODLine`) 與雜訊基線
+    2. 訊號的垂直線 (單一 `LineCollection`)
+    3. 訊號的星號標記 (單一 `Line2D`) 與 max_noise 門檻線
+    4. 有上限、只標註可見範圍內訊號的註解 (重複使用的 `Annotation`)
+    5. 可見範圍內的統計量文字
+- 因此拖動滑桿時，每次更新的 artist 數量固定，與訊號數量無關。
+- 星號、垂直線與註解只取可見範圍內的訊號 (`time_window.TimeIndex`，零複製的 view)，縮放、平移的成本與視窗大小成正比。
+
+---
+
+View state of `simple_MS_data_plotter.py`: every artist is created once and afterwards only its data and
+visibility are updated in place, instead of `ax.clear()` and redrawing.
+
+- Owned artists:
+    1. the raw trace (`LODLine`) and the noise baseline
+    2. the signal bars (one `LineCollection`)
+    3. the signal star markers (one `Line2D`) and the max_noise threshold line
+    4. a capped set of annotations for the visible signals only (reused `Annotation` objects)
+    5. a text with the statistics of the visible window
+- Dragging a slider therefore updates a constant number of artists, regardless of the signal count.
+- The stars, bars and annotations only get the signals of the visible window (`time_window.TimeIndex`,
+  zero-copy views), so zooming and panning cost in proportion to the window size.
+"""
+import numpy as np
+from matplotlib.collections import LineCollection
+
+import instrumentation as instr
+from lod_renderer import MinMaxPyramid, LODLine
+from time_window import TimeIndex
+
+
+class SignalView():
+    def __init__(self, ax, micro_sec, mini_volts, stats, pyramid=None, max_annotations=100):
+        self.ax = ax
+        self.micro_sec = micro_sec
+        self.mini_volts = mini_volts
+        self.stats = stats
+        self.max_annotations = max_annotations   # 註解數量上限
+        self.mode = 'original'                   # 'original'、'labeled' 或 'signals'
+        self.annotating = False                  # 是否顯示註解
+        self.__marked = False                    # 是否顯示門檻線與星號 (移動 signal ratio 滑桿後)
+        self.__signals = TimeIndex(np.empty(0))  # 目前訊號點的時間 (依時間排序)，用於取出可見範圍
+        self.__signal_y = np.empty(0)            # 目前訊號點的電壓
+        self.__max_noise = None                  # 目前的門檻；設定之前不顯示訊號數
+        self.__time_index = TimeIndex(micro_sec) # 原始資料的時間索引，用於可見範圍的取樣點數
+
+        if pyramid is None:
+            pyramid = MinMaxPyramid(micro_sec, mini_volts)
+        self.renderer = LODLine(ax, pyramid, lw=1)                                       # 保留參照，縮放時才會重新抽樣
+        self.trace = self.renderer.line                                                  # 原始波形
+        self.baseline_line = ax.axhline(y=stats.baseline, color='red')                   # baseline
+        self.max_noise_line = ax.axhline(y=stats.baseline, color='red', linestyle='--')  # max_noise line
+        self.stars, = ax.plot([], [], marker='*', color='red', linestyle='')             # 訊號的星號
+        self.bars = LineCollection([], lw=1, color='#1c8acd')                            # 訊號的垂直線
+        ax.add_collection(self.bars, autolim=False)
+        self.annotations = []                                                            # 重複使用的註解
+        self.window_text = ax.text(0.99, 0.97, '', transform=ax.transAxes, ha='right', va='top', fontsize=8)  # 可見範圍的統計量
+
+        # 縮放、平移時只更新可見範圍內的訊號
+        ax.callbacks.connect('xlim_changed', self.refresh_window)
+        self.set_mode('original')
+
+    def set_mode(self, mode):
+        """
+        Switch between the 'original', 'labeled' and 'signals' charts by visibility only.
+
+        Parameters:
+        mode (str): 'original', 'labeled' or 'signals'.
+
+        Returns:
+        None
+        """
+        self.mode = mode
+        self.__marked = False
+        self.ax.set_title({'original': 'Unlabeled', 'labeled': 'Labeled', 'signals': 'Signals'}[mode])
+        self.__update_visibility()
+
+    def __update_visibility(self):
+        self.trace.set_visible(self.mode != 'signals')
+        self.baseline_line.set_visible(self.mode == 'labeled')
+        self.bars.set_visible(self.mode == 'signals')
+        self.max_noise_line.set_visible(self.__marked and self.mode != 'signals')
+        self.stars.set_visible(self.__marked and self.mode != 'signals')
+
+    def set_signal_ratio(self, signal_ratio, mark=True):
+        """
+        Update the threshold line, stars, bars and annotations for a new signal ratio, in place.
+
+        Parameters:
+        signal_ratio (float): Slider value in (0, 1].
+        mark (bool): Show the threshold line and stars (as after moving the slider).
+
+        Returns:
+        None
+        """
+        max_noise = self.stats.max_noise(signal_ratio)
+        signal_idx = self.stats.indices_above(max_noise)
+        self.__signals = TimeIndex(self.micro_sec[signal_idx])
+        self.__signal_y = self.mini_volts[signal_idx]
+
+        self.max_noise_line.set_ydata([max_noise, max_noise])
+        self.__max_noise = max_noise
+        if mark:
+            self.__marked = True
+            self.__update_visibility()
+        self.refresh_window()
+
+    def __visible_signals(self):
+        # 訊號點依時間排序，以二分搜尋取出可見範圍 (view，不複製)
+        return self.__signals.window(*self.ax.get_xlim(), self.__signal_y)
+
+    def refresh_window(self, ax=None):
+        """
+        Feed the signals of the current x range into the stars, bars, annotations and window statistics.
+
+        Parameters:
+        ax (matplotlib.axes.Axes): Passed by the `xlim_changed` callback; unused.
+
+        Returns:
+        None
+        """
+        x, y = self.__visible_signals()
+        self.stars.set_data(x, y)
+
+        # 每條垂直線為 [(x, 0), (x, y)]
+        segments = np.zeros((len(x), 2, 2))
+        segments[:, :, 0] = x[:, None]
+        segments[:, 1, 1] = y
+        self.bars.set_segments(segments)
+        self.refresh_annotations()
+
+        # 只以二分搜尋計數，不掃描可見範圍的資料
+        window = self.__time_index.window_stats(*self.ax.get_xlim(), signals=self.__signals if self.__max_noise is not None else None)
+        signals = f"{window['signals']} signal samples / " if window['signals'] is not None else ""
+        self.window_text.set_text(f"{signals}{window['samples']} samples in view")
+
+    def toggle_annotations(self):
+        """
+        Show or hide the annotations of the visible signals.
+
+        Returns:
+        None
+        """
+        self.annotating = not self.annotating
+        self.refresh_annotations()
+
+    def refresh_annotations(self):
+        """
+        Annotate the signals inside the current x range, at most `max_annotations` of them (the highest).
+
+        Existing `Annotation` objects are reused; only missing ones are created, up to the cap.
+
+        Returns:
+        None
+        """
+        x, y = np.empty(0), np.empty(0)
+        if self.annotating:
+            x, y = self.__visible_signals()
+            if len(x) > self.max_annotations:
+                highest = np.sort(np.argpartition(y, -self.max_annotations)[-self.max_annotations:])
+                x, y = x[highest], y[highest]
+
+        while len(self.annotations) < len(x):
+            self.annotations.append(self.ax.annotate('', xy=(0, 0), xytext=(5, 5), textcoords='offset points', fontsize=8, color='blue'))
+            instr.count('artists')
+
+        for i, annotation in enumerate(self.annotations):
+            if i < len(x):
+                annotation.xy = (x[i], y[i])
+                annotation.set_text(f'({x[i]:.2f}, {y[i]:.2f})')
+                annotation.set_visible(True)
+            else:
+                annotation.set_visible(False)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+ROI 內訊號光點 (spot) 的擷取：對「ROI ∩ 顏色遮罩」做連通區域標記 (connected components)，
+回傳每個 ROI 的光點數、各光點的面積、質心與積分強度。
+
+- 每個 ROI 只對其範圍內的遮罩呼叫一次 `cv.connectedComponentsWithStats`，強度以 `np.bincount` 加總，
+  沒有逐像素的 Python 迴圈，可跟上批次處理的速度。
+
+---
+
+Signal spot extraction inside the ROIs: the "ROI ∩ color mask" is labeled into connected components, and the
+spot count of every ROI, with the area, centroid and integrated intensity of every spot, is returned.
+
+- Each ROI costs one `cv.connectedComponentsWithStats` call on its part of the mask, and the intensities are
+  summed with `np.bincount`; there is no per-pixel Python loop, so it keeps up with batch runs.
+"""
+import numpy as np
+import cv2 as cv
+
+from roi_statistics import write_table
+
+
+# 光點列表的格式；座標為整張影像的像素座標
+SPOT_DTYPE = np.dtype([
+    ('roi', np.int64),
+    ('spot', np.int64),
+    ('area', np.int64),
+    ('centroid_x', np.float64),
+    ('centroid_y', np.float64),
+    ('left', np.int64),
+    ('top', np.int64),
+    ('width', np.int64),
+    ('height', np.int64),
+    ('intensity', np.float64),
+])
+
+
+def extract_spots(mask, frame_list, img=None, connectivity=8, min_area=1):
+    """
+    Label the connected components of `mask` inside each ROI frame.
+
+    Parameters:
+    mask (numpy.ndarray): Color mask (0 or 255), e.g. from `color_filter.default_bgr_color_filter`.
+    frame_list (list): Reorganized ROI frames as [[start_x, start_y], [end_x, end_y]] (end exclusive).
+    img (numpy.ndarray): Decoded image; its gray level is summed over each spot as the intensity. Optional.
+    connectivity (int): 4 or 8.
+    min_area (int): Spots smaller than this number of pixels are dropped.
+
+    Returns:
+    numpy.ndarray: One row per spot, of dtype `SPOT_DTYPE`, ordered by ROI; the intensity is NaN when no image
+    was given.
+    """
+    height, width = mask.shape[:2]
+    gray = None
+    if img is not None:
+        gray = cv.cvtColor(img, cv.COLOR_BGRA2GRAY if img.shape[2] == 4 else cv.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+    spots = []
+    for roi, frame in enumerate(frame_list):
+        x0, x1 = np.clip([frame[0][0], frame[1][0]], 0, width)
+        y0, y1 = np.clip([frame[0][1], frame[1][1]], 0, height)
+        if x0 >= x1 or y0 >= y1:
+            continue
+
+        # 只標記 ROI 範圍內的遮罩；第 0 個標籤為背景
+        n_labels, labels, stats, centroids = cv.connectedComponentsWithStats(mask[y0:y1, x0:x1], connectivity=connectivity)
+        keep = np.flatnonzero(stats[1:, cv.CC_STAT_AREA] >= min_area) + 1
+
+        table = np.zeros(len(keep), dtype=SPOT_DTYPE)
+        table['roi'] = roi
+        table['spot'] = np.arange(len(keep))
+        table['area'] = stats[keep, cv.CC_STAT_AREA]
+        table['centroid_x'] = centroids[keep, 0] + x0
+        table['centroid_y'] = centroids[keep, 1] + y0
+        table['left'] = stats[keep, cv.CC_STAT_LEFT] + x0
+        table['top'] = stats[keep, cv.CC_STAT_TOP] + y0
+        table['width'] = stats[keep, cv.CC_STAT_WIDTH]
+        table['height'] = stats[keep, cv.CC_STAT_HEIGHT]
+        if gray is None:
+            table['intensity'] = np.nan
+        else:
+            # 依標籤一次加總整個 ROI 的灰階值
+            table['intensity'] = np.bincount(labels.ravel(), weights=gray[y0:y1, x0:x1].ravel(), minlength=n_labels)[keep]
+        spots.append(table)
+
+    return np.concatenate(spots) if spots else np.zeros(0, dtype=SPOT_DTYPE)
+
+
+def spot_counts(spots, n_rois):
+    """
+    Number of spots in each ROI.
+
+    Parameters:
+    spots (numpy.ndarray): Output of `extract_spots`.
+    n_rois (int): Number of ROI frames.
+
+    Returns:
+    numpy.ndarray: Array of length `n_rois`.
+    """
+    return np.bincount(spots['roi'], minlength=n_rois)
+
+
+def write_spots(path, tables):
+    """
+    Write the spots of many images as one CSV, one row per spot.
+
+    Parameters:
+    path (str): Output path.
+    tables (list): (image name, `extract_spots` output) pairs.
+
+    Returns:
+    None
+    """
+    write_table(path, tables, SPOT_DTYPE)
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+逐區塊 (chunk) 串流偵測訊號峰，用於大於記憶體的 TOF-MS 原始資料；記憶體用量與檔案長度無關。
+
+- 第一次掃描：以有限的記憶體統計最小值、最大值，以及各電壓值出現次數 (用於求眾數，即雜訊基線)；
+  電壓值的種類超過上限時 (例如未量化或平均過的波形)，改以固定寬度的分箱計數，記憶體仍有上限
+- 第二次掃描：依 `max_noise` 門檻逐區塊偵測訊號峰；跨越區塊邊界的訊號峰會被保留到下一個區塊，不會被切斷
+
+---
+
+Chunked, streaming peak extraction for TOF-MS raw data larger than RAM; peak memory does not depend on the
+file length.
+
+- First pass: minimum, maximum and the count of every voltage level (for the mode, i.e. the noise baseline)
+  are gathered with bounded memory; past a cap on the number of distinct levels (e.g. unquantized or
+  averaged traces) the counts fall back to fixed-width bins, so the memory stays bounded.
+- Second pass: peaks above the `max_noise` threshold are detected chunk by chunk; a peak straddling a chunk
+  boundary is carried over to the next chunk instead of being split.
+"""
+import numpy as np
+
+import peak_detector as pkd
+
+
+def iter_chunks(file, chunk_size=1_000_000, block_bytes=1 << 24):
+    """
+    Read a space-separated two-column .data file as fixed-size chunks.
+
+    Parameters:
+    file (str): Path of the .data file.
+    chunk_size (int): Number of samples per chunk; only the last chunk may be shorter.
+    block_bytes (int): Number of bytes read from the file at a time.
+
+    Returns:
+    generator: Yields (micro_sec, mini_volts) arrays.
+    """
+    pending = b''      # 上一次讀取時，尚未讀完的最後一行
+    buffered = []      # 已解析、但還不足一個區塊的取樣點
+    n_buffered = 0
+
+    with open(file, 'rb') as f:
+        while True:
+            block = f.read(block_bytes)
+            if block:
+                block = pending + block
+                cut = block.rfind(b'\n') + 1
+                pending, block = block[cut:], block[:cut]
+            else:
+                block, pending = pending, b''   # 檔案結尾：解析最後一行 (可能沒有換行)
+
+            if block:
+                values = np.fromstring(block.decode(), sep=' ')
+                if len(values) % 2:
+                    raise ValueError(f"{file} does not contain two columns")
+                buffered.append(values.reshape(-1, 2))
+                n_buffered += len(buffered[-1])
+
+            # 湊滿一個區塊就輸出
+            while n_buffered >= chunk_size or (not block and n_buffered):
+                samples = np.concatenate(buffered) if len(buffered) > 1 else buffered[0]
+                chunk, rest = samples[:chunk_size], samples[chunk_size:]
+                buffered, n_buffered = ([rest] if len(rest) else []), len(rest)
+                yield chunk[:, 0].copy(), chunk[:, 1].copy()
+
+            if not block:
+                break
+
+
+def iter_array_chunks(micro_sec, mini_volts, chunk_size=1_000_000):
+    """
+    Cut already-loaded (e.g. memory-mapped, see `ms_data_loader`) arrays into fixed-size chunks.
+
+    Returns:
+    generator: Yields (micro_sec, mini_volts) views.
+    """
+    for start in range(0, len(micro_sec), chunk_size):
+        yield micro_sec[start:start + chunk_size], mini_volts[start:start + chunk_size]
+
+
+class StreamStats():
+    def __init__(self, max_levels=1 << 16):
+        self.count = 0                                  # 取樣點數
+        self.min = np.inf                               # 最小值
+        self.max = -np.inf                              # 最大值
+        self.max_levels = max_levels                    # 電壓值種類的上限 (16 位元 ADC 的所有數值)
+        self.bin_width = None                           # None 時 levels 為精確的電壓值；否則為分箱的索引
+        self.levels = np.empty(0)                       # 出現過的電壓值或分箱索引 (由小到大)
+        self.level_counts = np.empty(0, dtype=np.int64) # 各電壓值 (分箱) 出現的次數
+
+    def update(self, mini_volts):
+        """
+        Add one chunk of voltages.
+
+        Memory is bounded by `max_levels`: the exact levels of a quantized trace are counted as long as there
+        are at most that many; beyond, the counts are merged into fixed-width bins, whose width is doubled
+        whenever the bins exceed the cap again.
+
+        Parameters:
+        mini_volts (numpy.ndarray)
+
+        Returns:
+        None
+        """
+        if len(mini_volts) == 0:
+            return
+        self.count += len(mini_volts)
+        self.min = min(self.min, mini_volts.min())
+        self.max = max(self.max, mini_volts.max())
+
+        keys = mini_volts if self.bin_width is None else np.floor(mini_volts / self.bin_width)
+        self.__merge(*np.unique(keys, return_counts=True))
+        while len(self.levels) > self.max_levels:
+            self.__coarsen()
+
+    def __merge(self, levels, counts):
+        # 將計數併入既有的直方圖
+        levels, inverse = np.unique(np.concatenate((self.levels, levels)), return_inverse=True)
+        self.level_counts = np.bincount(inverse, weights=np.concatenate((self.level_counts, counts))).astype(np.int64)
+        self.levels = levels
+
+    def __coarsen(self):
+        # 第一次：以目前範圍的一半上限數量分箱；之後每次將分箱寬度加倍 (相鄰兩箱合併)
+        if self.bin_width is None:
+            self.bin_width = (self.max - self.min) / (self.max_levels // 2)
+            keys = np.floor(self.levels / self.bin_width)
+        else:
+            self.bin_width *= 2
+            keys = np.floor(self.levels / 2)
+        counts = self.level_counts
+        self.levels, self.level_counts = np.empty(0), np.empty(0, dtype=np.int64)
+        self.__merge(keys, counts)
+
+    @property
+    def baseline(self):
+        """
+        Mode of the voltages (the smallest value on ties, as `pandas.Series.mode()`); the center of the most
+        populated bin once the levels are binned.
+        """
+        mode = self.levels[np.argmax(self.level_counts)]
+        return mode if self.bin_width is None else (mode + 0.5) * self.bin_width
+
+    def max_noise(self, signal_ratio):
+        """
+        Threshold of the signal ratio / SNR slider.
+
+        Returns:
+        float
+        """
+        return pkd.noise_threshold(self.max, self.baseline, signal_ratio)
+
+
+def scan_stats(chunks):
+    """
+    First pass: gather the statistics of a whole trace from its chunks.
+
+    Parameters:
+    chunks (iterable): (micro_sec, mini_volts) chunks, e.g. from `iter_chunks`.
+
+    Returns:
+    StreamStats
+    """
+    stats = StreamStats()
+    for _, mini_volts in chunks:
+        stats.update(np.asarray(mini_volts))
+    return stats
+
+
+class StreamingPeakDetector():
+    def __init__(self, threshold, baseline=None):
+        self.threshold = threshold            # max_noise
+        self.baseline = baseline              # 面積的參考基線
+        self.__carry_t = np.empty(0)          # 跨越區塊邊界、尚未結束的訊號峰 (加上其前一個取樣點)
+        self.__carry_v = np.empty(0)
+        self.__offset = 0                     # __carry 第一個取樣點於整個檔案中的索引
+
+    def feed(self, micro_sec, mini_volts):
+        """
+        Detect the peaks that are complete after adding one chunk.
+
+        The samples kept from the previous chunk are prepended, so a peak straddling the boundary is seen
+        whole, and every sample keeps its neighbours for the area. A peak still open at the end of the chunk
+        is kept for the next call.
+
+        Parameters:
+        micro_sec (numpy.ndarray): Time of the chunk.
+        mini_volts (numpy.ndarray): Voltage of the chunk.
+
+        Returns:
+        numpy.ndarray: Peaks of dtype `PEAK_DTYPE`, with indices relative to the whole file.
+        """
+        t = np.concatenate((self.__carry_t, micro_sec))
+        v = np.concatenate((self.__carry_v, mini_volts))
+        if len(v) == 0:
+            return np.empty(0, dtype=pkd.PEAK_DTYPE)
+        peaks = pkd.detect_peaks(t, v, self.threshold, self.baseline)
+
+        # 最後一個訊號峰若延伸到區塊結尾，則留待下一個區塊
+        if len(peaks) and peaks['end'][-1] == len(v) - 1:
+            keep = max(peaks['start'][-1] - 1, 0)
+            peaks = peaks[:-1]
+        else:
+            keep = len(v) - 1   # 保留最後一點，作為下一個區塊第一點的鄰居
+
+        peaks['start'] += self.__offset
+        peaks['apex'] += self.__offset
+        peaks['end'] += self.__offset
+        self.__carry_t, self.__carry_v = t[keep:].copy(), v[keep:].copy()
+        self.__offset += keep
+        return peaks
+
+    def finish(self):
+        """
+        Flush the peak still open at the end of the trace.
+
+        Returns:
+        numpy.ndarray: Peaks of dtype `PEAK_DTYPE`.
+        """
+        peaks = pkd.detect_peaks(self.__carry_t, self.__carry_v, self.threshold, self.baseline)
+        peaks['start'] += self.__offset
+        peaks['apex'] += self.__offset
+        peaks['end'] += self.__offset
+        self.__carry_t, self.__carry_v = np.empty(0), np.empty(0)
+        return peaks
+
+
+def stream_peaks(file, signal_ratio, chunk_size=1_000_000):
+    """
+    Detect the peaks of a .data file in two streaming passes.
+
+    Parameters:
+    file (str): Path of the .data file.
+    signal_ratio (float): Same meaning as the plotters' signal ratio / SNR slider.
+    chunk_size (int): Number of samples per chunk.
+
+    Returns:
+    generator: Yields arrays of peaks (dtype `PEAK_DTYPE`) in time order, chunk by chunk.
+    """
+    stats = scan_stats(iter_chunks(file, chunk_size))
+    detector = StreamingPeakDetector(stats.max_noise(signal_ratio), stats.baseline)
+    for micro_sec, mini_volts in iter_chunks(file, chunk_size):
+        yield detector.feed(micro_sec, mini_volts)
+    yield detector.finish()
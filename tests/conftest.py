@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""
+測試共用設定：模組位於專案根目錄 (沒有套件)，將其加入 sys.path；matplotlib 一律使用不開視窗的 Agg 後端。
+
+---
+
+Shared test setup: the modules live in the project root (there is no package), so it is added to sys.path;
+matplotlib always uses the headless Agg backend.
+"""
+import os
+import sys
+
+import matplotlib
+
+matplotlib.use('Agg')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+from acquisition_catalog import AcquisitionCatalog, parse_file_name
+
+
+def test_parse_file_name():
+    params = parse_file_name("20240105_3_20.01k_19.05k_660ns_MCP2.1kV_1.data")
+    assert params['date'] == "2024-01-05"
+    assert params['run'] == 3
+    assert (params['voltage1_kv'], params['voltage2_kv']) == (20.01, 19.05)
+    assert params['delay_ns'] == 660.0
+    assert params['mcp_kv'] == 2.1
+    assert params['frame'] == 1
+
+
+def test_scan_of_some_extensions_keeps_the_other_files(tmp_path):
+    data_dir = tmp_path / "runs"
+    data_dir.mkdir()
+    (data_dir / "20240105_3_660ns_1.data").write_text("0 0\n")
+    (data_dir / "20240105_3_660ns_1.png").write_bytes(b"png")
+
+    with AcquisitionCatalog(str(tmp_path / "catalog.sqlite")) as catalog:
+        assert catalog.scan(str(data_dir))['added'] == 2
+        counts = catalog.scan(str(data_dir), ('.DATA',))
+        assert (counts['unchanged'], counts['removed']) == (1, 0)
+        assert [path.split("/")[-1] for path in catalog.select(str(data_dir), delay_ns=660)] == \
+            ["20240105_3_660ns_1.data", "20240105_3_660ns_1.png"]
+
+        (data_dir / "20240105_3_660ns_1.png").unlink()
+        assert catalog.scan(str(data_dir), ('.data',))['removed'] == 1
+        assert catalog.select(str(data_dir), extension=".png") == []
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import instrumentation as instr
+
+
+@pytest.fixture
+def profile(tmp_path, monkeypatch):
+    monkeypatch.delenv('MS_PROFILE', raising=False)
+    monkeypatch.delenv('MS_PROFILE_RUN', raising=False)
+    yield str(tmp_path / "profile.jsonl")
+    instr.disable()
+
+
+def run(path, files):
+    instr.enable(path)
+    for file in files:
+        with instr.file_record(file):
+            with instr.stage('load'):
+                pass
+    return instr.run_id()
+
+
+def test_summary_of_one_run_ignores_earlier_runs(profile, monkeypatch):
+    first = run(profile, ["a.data", "b.data"])
+    monkeypatch.delenv('MS_PROFILE_RUN')  # 新的一次執行
+    second = run(profile, ["c.data"])
+    assert first != second
+
+    assert len(instr.read_records(profile)) == 3
+    records = instr.read_records(profile, second)
+    assert [record['file'] for record in records] == ["c.data"]
+    assert instr.summary(records)['load']['n'] == 1
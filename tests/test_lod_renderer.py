@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import gc
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from lod_renderer import MinMaxPyramid
+from signal_view import SignalView
+from trace_stats import TraceStats
+
+
+def synthetic_trace(n=1_000_000, seed=0):
+    rng = np.random.default_rng(seed)
+    micro_sec = np.linspace(0, 100, n)
+    mini_volts = np.round(rng.normal(0, 1, n), 1)
+    mini_volts[rng.integers(0, n, 50)] += 20
+    return micro_sec, mini_volts
+
+
+def test_signal_view_redecimates_after_gc():
+    micro_sec, mini_volts = synthetic_trace()
+    fig, ax = plt.subplots()
+    view = SignalView(ax, micro_sec, mini_volts, TraceStats(mini_volts))
+    before = len(view.trace.get_xdata())
+
+    gc.collect()
+    ax.set_xlim(10, 20)
+    x = view.trace.get_xdata()
+    assert len(x) != before
+    assert 9.9 <= x[0] and x[-1] <= 20.1  # 視窗左右各多取一個區塊
+    plt.close(fig)
+
+
+def test_pyramid_query_keeps_window_extremes():
+    micro_sec, mini_volts = synthetic_trace(100_000)
+    pyramid = MinMaxPyramid(micro_sec, mini_volts)
+    x, y = pyramid.query(25, 75, 800)
+    inside = (micro_sec >= 25) & (micro_sec <= 75)
+    assert len(x) <= 4 * 800
+    assert y.max() == mini_volts[inside].max()
+    assert y.min() <= mini_volts[inside].min()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+import mass_calibration
+from mass_calibration import MassCalibration, MzGrid, SpectrumStack
+
+
+def test_fit_recovers_the_calibration():
+    masses = np.array([1.008, 18.01, 44.0, 78.05])
+    calibration = MassCalibration.fit(0.12 + 0.8 * np.sqrt(masses), masses)
+    assert calibration.t0 == pytest.approx(0.12)
+    assert calibration.k == pytest.approx(0.8)
+    np.testing.assert_allclose(calibration.residuals(calibration.to_time(masses), masses), 0, atol=1e-9)
+
+
+def test_to_mz_of_scalars_and_arrays():
+    calibration = MassCalibration(0.5, 2.0)
+    assert np.ndim(calibration.to_mz(4.5)) == 0
+    assert float(calibration.to_mz(4.5)) == pytest.approx(4.0)
+    assert np.isnan(calibration.to_mz(0.1))
+    mz = calibration.to_mz([[0.1, 2.5], [4.5, 6.5]])
+    assert mz.shape == (2, 2)
+    assert np.isnan(mz[0, 0]) and mz[1, 1] == pytest.approx(9.0)
+
+
+def test_fit_rejects_decreasing_flight_times():
+    masses = np.array([1.0, 4.0, 9.0])
+    with pytest.raises(ValueError):
+        MassCalibration.fit(5.0 - np.sqrt(masses), masses)
+
+
+def test_stack_preserves_the_integrated_intensity():
+    calibration = MassCalibration(0.0, 1.0)
+    micro_sec = np.linspace(0.5, 5, 1000)
+    intensity = np.ones(1000)
+    stack = SpectrumStack(MzGrid(0, float(calibration.to_mz(5.0)) + 0.1, 0.1), capacity=1)
+    stack.add(micro_sec, intensity, calibration)
+    stack.add(micro_sec, 2 * intensity, calibration)
+    assert stack.spectra.shape[0] == 2
+    np.testing.assert_allclose(stack.spectra.sum(axis=1), [1000, 2000])
+
+
+def test_grid_rejects_an_empty_range():
+    with pytest.raises(ValueError):
+        MzGrid(10.0, 10.0, 0.1)
+    with pytest.raises(ValueError):
+        MzGrid(1.0, np.nan, 0.1)
+
+
+@pytest.mark.parametrize("early_record", [False, True])
+def test_main_reports_an_unusable_default_range(tmp_path, monkeypatch, capsys, early_record):
+    monkeypatch.chdir(tmp_path)  # .npy 快取與輸出寫在暫存資料夾
+    argv = ["mass_calibration.py", str(tmp_path), "--ref", "1.0", "1.0", "--ref", "2.0", "4.0"]
+    if early_record:
+        # 紀錄在 t0 = 0 μs 之前結束 (k = 1 μs)，預設的 m/z 上限為 NaN
+        micro_sec = np.linspace(-1.0, -0.5, 50)
+        np.savetxt(tmp_path / "early.data", np.c_[micro_sec, np.ones(50)], fmt='%.4f')
+    monkeypatch.setattr("sys.argv", argv)
+    with pytest.raises(SystemExit) as exit_info:
+        mass_calibration.main()
+    assert exit_info.value.code == 2
+    assert ("before t0" if early_record else "no .data files") in capsys.readouterr().err
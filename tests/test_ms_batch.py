@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from ms_batch import run_batch
+
+
+def test_batch_skips_other_files_and_survives_failures(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # .npy 快取寫在暫存資料夾
+    input_dir = tmp_path / "in"
+    (input_dir / "sub").mkdir(parents=True)
+    micro_sec = np.linspace(0, 10, 2000)
+    mini_volts = np.round(np.random.default_rng(0).normal(0, 1, 2000), 1)
+    mini_volts[100] = 30
+    np.savetxt(input_dir / "good.data", np.c_[micro_sec, mini_volts], fmt='%.4f')
+    (input_dir / "bad.data").write_text("not a trace\n")
+    (input_dir / "README.md").write_text("notes\n")
+
+    records = run_batch(str(input_dir), 0.95, str(tmp_path / "out"), workers=1)
+    assert sorted(record['file'] for record in records) == ["bad.data", "good.data"]
+    failed = [record for record in records if 'error' in record]
+    assert [record['file'] for record in failed] == ["bad.data"]
+    assert (tmp_path / "out" / "good.png").exists()
+    assert (tmp_path / "out" / "peaks.csv").exists()
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import os
+
+import numpy as np
+
+from ms_data_loader import load_ms_data
+
+
+def write_trace(path, volts):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(f"{i} {v}\n" for i, v in enumerate(volts)))
+    return str(path)
+
+
+def test_same_names_in_different_folders_keep_their_caches(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    a = write_trace(tmp_path / "a" / "x.data", [1, 2])
+    b = write_trace(tmp_path / "b" / "x.data", [5, 6])
+    bak = write_trace(tmp_path / "a" / "x.data.bak", [7, 8])
+    for file in (a, b, bak):
+        load_ms_data(file, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 3
+
+    # 原始檔變動：只取代它自己的快取
+    write_trace(tmp_path / "a" / "x.data", [3, 4, 5])
+    _, mini_volts = load_ms_data(a, cache_dir=cache_dir)
+    np.testing.assert_array_equal(mini_volts, [3, 4, 5])
+    assert len(os.listdir(cache_dir)) == 3
+    np.testing.assert_array_equal(load_ms_data(b, cache_dir=cache_dir)[1], [5, 6])
+    np.testing.assert_array_equal(load_ms_data(bak, cache_dir=cache_dir)[1], [7, 8])
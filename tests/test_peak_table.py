@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+import peak_detector as pkd
+import peak_table as pkt
+from trace_stats import TraceStats
+
+
+def quantized_trace(n=20_000, step=4.0, seed=0):
+    rng = np.random.default_rng(seed)
+    micro_sec = np.linspace(0, 20, n)
+    mini_volts = np.round(rng.normal(0, 1.5, n) / step) * step
+    mini_volts[[1000, 5000, 9000]] = [40, 60, 80]
+    return micro_sec, mini_volts
+
+
+def test_snr_is_finite_on_quantized_trace(tmp_path):
+    micro_sec, mini_volts = quantized_trace()
+    stats = TraceStats(mini_volts)
+    peaks = pkd.detect_peaks(micro_sec, mini_volts, 20.0, baseline=stats.baseline)
+    table = pkt.build_peak_table("q.data", peaks, micro_sec, stats.baseline, stats.noise_sigma)
+    assert len(table) == 3
+    assert np.isfinite(table['snr']).all()
+
+    path = str(tmp_path / "peaks.csv")
+    pkt.write_peak_tables([table], path)
+    assert np.isfinite(pd.read_csv(path)['snr']).all()
+
+
+def test_snr_is_nan_without_noise():
+    micro_sec, mini_volts = quantized_trace()
+    peaks = pkd.detect_peaks(micro_sec, mini_volts, 20.0, baseline=0.0)
+    table = pkt.build_peak_table("q.data", peaks, micro_sec, 0.0, 0.0)
+    assert len(table) == 3
+    assert table['snr'].isna().all()
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import cv2 as cv
+
+import selecting_roi_frame as srf
+from roi_batch import list_images, run_batch
+
+
+def test_batch_skips_other_files_and_survives_failures(tmp_path):
+    input_dir = tmp_path / "images"
+    (input_dir / "sub").mkdir(parents=True)
+    img = np.zeros((64, 64, 3), np.uint8)
+    img[10:20, 10:20] = (255, 255, 255)
+    cv.imwrite(str(input_dir / "good.png"), img)
+    (input_dir / "broken.png").write_bytes(b"not an image")
+    (input_dir / "good.json").write_text("[]")
+    (input_dir / "notes.csv").write_text("a,b\n")
+    template = str(tmp_path / "roi.json")
+    srf.save_frame_list([[[0, 0], [32, 32]]], template)
+
+    img_list = list_images(str(input_dir))
+    assert [path.split("/")[-1] for path in img_list] == ["broken.png", "good.png"]
+
+    records = run_batch(img_list, str(tmp_path / "out"), roi_template=template, workers=1)
+    assert sorted(record['img'] for record in records) == ["broken.png", "good.png"]
+    assert [record['img'] for record in records if 'error' in record] == ["broken.png"]
+    assert (tmp_path / "out" / "good.png").exists()
+    assert (tmp_path / "out" / "roi_stats.csv").exists()
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import cv2 as cv
+
+from roi_stream import sequence_files, iter_frames
+
+
+def test_sequence_numbers_only_decoded_images(tmp_path):
+    for i in (0, 1, 10):
+        img = np.full((8, 8, 3), i, np.uint8)
+        cv.imwrite(str(tmp_path / f"f_{i}.png"), img)
+    (tmp_path / "a_notes.txt").write_text("notes")
+    (tmp_path / "f_5.png").write_bytes(b"not an image")
+    (tmp_path / "sub.png").mkdir()
+
+    files = sequence_files(str(tmp_path))
+    assert [path.split("/")[-1] for path in files] == ["f_0.png", "f_1.png", "f_5.png", "f_10.png"]
+
+    frames = list(iter_frames(str(tmp_path)))
+    assert [index for index, _, _ in frames] == [0, 1, 2]
+    assert [int(frame[0, 0, 0]) for _, _, frame in frames] == [0, 1, 10]
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+import peak_detector as pkd
+from streaming_detector import StreamStats, iter_array_chunks, scan_stats, stream_peaks
+from trace_stats import TraceStats
+
+
+def trace_with_peaks(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    micro_sec = np.round(np.arange(n) * 0.00025, 5)
+    mini_volts = np.round(rng.normal(0, 0.01, n), 3)
+    # 寬度不同的訊號峰，包含跨越區塊邊界、從第一點開始與延伸到最後一點者
+    for start, width in [(0, 3), (95, 10), (500, 40), (1999, 2), (3000, 1), (n - 4, 4)]:
+        mini_volts[start:start + width] += 0.5
+    return micro_sec, mini_volts
+
+
+@pytest.mark.parametrize('chunk_size', [7, 97, 100, 1000, 10_000])
+def test_stream_peaks_match_whole_trace_detection(tmp_path, chunk_size):
+    micro_sec, mini_volts = trace_with_peaks()
+    file = str(tmp_path / "trace.data")
+    np.savetxt(file, np.column_stack((micro_sec, mini_volts)), fmt='%.5f %.3f')
+    micro_sec, mini_volts = np.loadtxt(file).T
+
+    stats = TraceStats(mini_volts)
+    threshold = stats.max_noise(0.9)
+    expected = pkd.detect_peaks(micro_sec, mini_volts, threshold, stats.baseline)
+    peaks = np.concatenate(list(stream_peaks(file, 0.9, chunk_size)))
+    assert len(expected) == 6
+    for field in pkd.PEAK_DTYPE.names:
+        np.testing.assert_allclose(peaks[field], expected[field], err_msg=field)
+
+
+def test_stream_stats_of_quantized_trace_are_exact():
+    _, mini_volts = trace_with_peaks()
+    stats = scan_stats(iter_array_chunks(mini_volts, mini_volts, 333))
+    assert stats.bin_width is None
+    assert stats.baseline == TraceStats(mini_volts).baseline
+    assert (stats.min, stats.max) == (mini_volts.min(), mini_volts.max())
+
+
+def test_stream_stats_memory_is_bounded_on_unquantized_traces():
+    rng = np.random.default_rng(2)
+    stats = StreamStats(max_levels=1024)
+    for _ in range(50):
+        stats.update(rng.normal(3.0, 1.0, 10_000))  # 每個數值都不同
+        assert len(stats.levels) <= 1024
+    assert stats.count == 500_000
+    assert stats.bin_width is not None
+    assert stats.baseline == pytest.approx(3.0, abs=0.2)
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import cv2 as cv
+
+import color_filter as cf
+from roi_statistics import RoiIntegral
+from tiled_roi import copy_tiled, open_image, tiled_roi_stats
+
+
+FRAMES = [[[5, 7], [90, 60]], [[40, 30], [130, 110]], [[0, 0], [3, 3]]]
+
+
+def assert_same_stats(table, expected):
+    for column in ('pixels', 'x0', 'y0', 'x1', 'y1'):
+        np.testing.assert_array_equal(table[column], expected[column])
+    for column in ('centroid_x', 'centroid_y', 'intensity'):
+        np.testing.assert_allclose(table[column], expected[column], equal_nan=True)
+
+
+def test_color_image_matches_roi_integral():
+    img = np.random.default_rng(0).integers(0, 256, (120, 140, 3), dtype=np.uint8)
+    mask = cf.default_classifier.mask(img, 'signal')
+    assert_same_stats(tiled_roi_stats(img, FRAMES, tile_size=32), RoiIntegral(mask, img).stats(FRAMES))
+
+
+def test_grayscale_memmap_matches_roi_integral(tmp_path):
+    gray = np.random.default_rng(1).integers(0, 256, (120, 140), dtype=np.uint8)
+    path = str(tmp_path / "gray.npy")
+    np.save(path, gray)
+    img = open_image(path)
+    assert img.ndim == 2
+
+    mask = cf.default_classifier.mask(cv.cvtColor(gray, cv.COLOR_GRAY2BGR), 'signal')
+    output = copy_tiled(img, str(tmp_path / "painted.npy"), tile_size=32)
+    table = tiled_roi_stats(img, FRAMES, tile_size=32, output=output)
+    assert table['pixels'].sum() > 0
+    assert_same_stats(table, RoiIntegral(mask, gray).stats(FRAMES))
+
+    # 只有 ROI 內的訊號像素被塗成白色
+    inside = np.zeros(gray.shape, dtype=bool)
+    for (x0, y0), (x1, y1) in FRAMES:
+        inside[y0:y1, x0:x1] = True
+    painted = (mask > 0) & inside
+    assert (np.asarray(output)[painted] == 255).all()
+    np.testing.assert_array_equal(np.asarray(output)[~painted], gray[~painted])
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from lod_renderer import MinMaxPyramid
+from time_window import TimeIndex
+
+
+def test_range_minmax_matches_brute_force():
+    rng = np.random.default_rng(0)
+    mini_volts = rng.normal(0, 1, 1001)
+    pyramid = MinMaxPyramid(np.arange(1001), mini_volts)
+    for i0, i1 in [(0, 1001), (0, 1), (1000, 1001), (3, 4), (17, 999), *rng.integers(0, 1002, (200, 2))]:
+        i0, i1 = sorted((int(i0), int(i1)))
+        if i0 == i1:
+            assert np.isnan(pyramid.range_minmax(i0, i1)).all()
+        else:
+            assert pyramid.range_minmax(i0, i1) == (mini_volts[i0:i1].min(), mini_volts[i0:i1].max())
+
+
+def test_window_stats_match_a_scan_of_the_window():
+    rng = np.random.default_rng(1)
+    micro_sec = np.linspace(0, 10, 5000)
+    mini_volts = np.round(rng.normal(0, 1, 5000), 2)
+    threshold = 1.5
+    index = TimeIndex(micro_sec)
+    pyramid = MinMaxPyramid(micro_sec, mini_volts)
+    signals = TimeIndex(micro_sec[mini_volts > threshold])
+
+    for t0, t1 in [(0, 10), (-1, 11), (2.5, 2.51), (3, 7), (9.999, 20), (4, 3)]:
+        window = index.window_stats(t0, t1, pyramid, signals)
+        volts = mini_volts[(micro_sec >= t0) & (micro_sec <= t1)]
+        assert window['samples'] == len(volts)
+        assert window['signals'] == np.count_nonzero(volts > threshold)
+        if len(volts):
+            assert window['max'] == volts.max() and window['min'] == volts.min()
+        else:
+            assert np.isnan(window['max'])
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from trace_stats import TraceStats
+
+
+def test_noise_sigma_of_gaussian_noise():
+    rng = np.random.default_rng(0)
+    mini_volts = np.round(rng.normal(5, 2, 200_000), 1)  # 眾數需要重複的數值，如示波器的取樣
+    assert abs(TraceStats(mini_volts).noise_sigma - 2) < 0.1
+
+
+@pytest.mark.parametrize('sigma', [1.5, 2.2, 3.0, 5.0])
+def test_noise_sigma_of_quantized_trace(sigma):
+    # 4 mV 量化：小雜訊時大多數取樣點等於眾數，MAD 為 0 或量化間隔的倍數
+    rng = np.random.default_rng(1)
+    mini_volts = np.round(rng.normal(0, sigma, 100_000) / 4) * 4
+    mini_volts[rng.integers(0, 100_000, 200)] += 200  # 訊號不應影響估計
+    stats = TraceStats(mini_volts)
+    assert stats.baseline == 0
+    assert stats.noise_sigma == pytest.approx(sigma, rel=0.15)
+
+
+def test_noise_sigma_of_constant_trace():
+    assert TraceStats(np.full(100, 3.0)).noise_sigma == 0
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+「訊號數 - 訊雜比」曲線：每個檔案只計算一次 (`TraceStats.signal_curve`)，顯示於原始圖旁，
+以垂直線標出目前滑桿的位置，並以虛線標出建議的訊雜比 (曲線的轉折點)；拖動滑桿時只移動垂直線。
+
+---
+
+"Number of signals vs. signal ratio" curve: computed once per file (`TraceStats.signal_curve`) and shown
+beside the trace, with a vertical line at the current slider value and a dashed line at the suggested
+signal ratio (the knee of the curve); dragging the slider only moves the vertical line.
+"""
+import numpy as np
+
+
+class ThresholdCurve():
+    def __init__(self, ax, stats, signal_ratios=None):
+        self.ax = ax                                                          # 所屬的 Axes
+        self.stats = stats                                                    # 該檔案的 TraceStats
+        if signal_ratios is None:
+            signal_ratios = np.round(np.arange(1, 101) * 0.01, 2)              # 與滑桿相同的刻度
+        self.signal_ratios = np.asarray(signal_ratios, dtype=np.float64)
+        _, self.events = stats.signal_curve(self.signal_ratios)               # 一次算出整條曲線
+        self.suggestion = stats.suggest_signal_ratio(self.signal_ratios)      # 建議的訊雜比；沒有轉折點時為 None
+
+        ax.plot(self.signal_ratios, self.events, color='#1c8acd', lw=1)
+        ax.set_yscale('symlog', linthresh=1)
+        ax.set_xlabel('Signal ratio', fontsize=8)
+        ax.set_ylabel('Signals', fontsize=8)
+        ax.tick_params(labelsize=7)
+        if self.suggestion is not None:
+            ax.axvline(self.suggestion, color='green', linestyle='--', lw=1)
+        self.marker = ax.axvline(np.nan, color='red', lw=1)                   # 目前滑桿的位置
+        self.title = ax.set_title('', fontsize=8)
+
+    def set_signal_ratio(self, signal_ratio):
+        """
+        Move the marker to `signal_ratio` and show its number of signals.
+
+        Parameters:
+        signal_ratio (float): Slider value in (0, 1].
+
+        Returns:
+        None
+        """
+        self.marker.set_xdata([signal_ratio, signal_ratio])
+        _, events = self.stats.signal_curve([signal_ratio])
+        suggestion = f"\nsuggested {self.suggestion:.2f}" if self.suggestion is not None else ""
+        self.title.set_text(f'{events[0]} signals at {signal_ratio:.2f}{suggestion}')
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+超大偵測器影像 (例如拼接後的影像) 的分塊 (tile) 處理：顏色濾鏡與 ROI 統計逐塊進行，且只處理與 ROI 相交的區塊，
+因此峰值記憶體只與區塊大小有關，與整張影像的大小無關。
+
+- 原始資料若格式允許則以記憶體映射 (memory map) 開啟：`.npy` 以 `np.load(mmap_mode='r')`，無標頭的 `.raw`
+  需給定形狀；PNG 等壓縮格式無法映射，仍需整張解碼。處理完的列以 `madvise(MADV_DONTNEED)` 釋放。
+- 輸出的統計表與 `roi_statistics.RoiIntegral.stats()` 相同 (`ROI_STATS_DTYPE`)，可直接以 `write_roi_stats` 寫出。
+- 用法：`python tiled_roi.py big.npy --roi roi.json` 或 `python tiled_roi.py big.raw --shape 40000 60000 3 --roi roi.json`
+
+---
+
+Tiled processing of very large detector images (e.g. stitched frames): color filtering and ROI statistics run
+tile by tile, over the tiles that intersect ROIs only, so the peak memory depends on the tile size and not on
+the size of the frame.
+
+- Raw inputs are memory-mapped where the format allows: `.npy` with `np.load(mmap_mode='r')`, headerless
+  `.raw` given its shape; compressed formats such as PNG cannot be mapped and are still decoded whole. Rows
+  already processed are released with `madvise(MADV_DONTNEED)`.
+- The output table is the one of `roi_statistics.RoiIntegral.stats()` (`ROI_STATS_DTYPE`), so it can be
+  written with `write_roi_stats`.
+- Usage: `python tiled_roi.py big.npy --roi roi.json` or `python tiled_roi.py big.raw --shape 40000 60000 3 --roi roi.json`
+"""
+import os
+import mmap
+import time
+import argparse
+
+import numpy as np
+import cv2 as cv
+
+import selecting_roi_frame as srf
+import color_filter as cf
+from roi_statistics import ROI_STATS_DTYPE, write_roi_stats
+
+
+def open_image(path, shape=None, dtype=np.uint8):
+    """
+    Open an image, memory-mapped when the format allows.
+
+    Parameters:
+    path (str): `.npy`, headerless `.raw` / `.bin`, or any format readable by `cv.imread`.
+    shape (tuple): (height, width, channels) of a `.raw` / `.bin` file.
+    dtype (numpy.dtype): Pixel type of a `.raw` / `.bin` file.
+
+    Returns:
+    numpy.ndarray: A read-only memmap for `.npy` / `.raw` / `.bin`, otherwise the decoded BGR image.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        return np.load(path, mmap_mode='r')
+    if extension in (".raw", ".bin"):
+        if shape is None:
+            raise ValueError(f"the shape of {path} is required")
+        return np.memmap(path, dtype=dtype, mode='r', shape=tuple(shape))
+    img = cv.imread(path)
+    if img is None:
+        raise IOError(f"cannot read {path}")
+    return img
+
+
+def roi_tiles(shape, frame_list, tile_size=1024):
+    """
+    Tiles of a regular grid that intersect at least one ROI frame.
+
+    Parameters:
+    shape (tuple): (height, width) of the image.
+    frame_list (list): Reorganized ROI frames as [[start_x, start_y], [end_x, end_y]].
+    tile_size (int): Side of the tiles in pixels.
+
+    Returns:
+    list: (y0, y1, x0, x1) of the tiles, in row-major order.
+    """
+    height, width = shape[:2]
+    n_rows, n_cols = -(-height // tile_size), -(-width // tile_size)
+    used = np.zeros((n_rows, n_cols), dtype=bool)
+    for frame in frame_list:
+        x0, x1 = np.clip([frame[0][0], frame[1][0]], 0, width)
+        y0, y1 = np.clip([frame[0][1], frame[1][1]], 0, height)
+        if x0 < x1 and y0 < y1:
+            used[y0 // tile_size:(y1 - 1) // tile_size + 1, x0 // tile_size:(x1 - 1) // tile_size + 1] = True
+
+    return [(row * tile_size, min((row + 1) * tile_size, height), col * tile_size, min((col + 1) * tile_size, width))
+            for row, col in zip(*np.nonzero(used))]
+
+
+def release_rows(img, y0, y1):
+    """
+    Drop rows [y0, y1) of a memory-mapped image from the resident set, once they have been processed;
+    the pages stay in the file (and page cache) and are read again if needed. No-op for in-memory arrays.
+
+    Returns:
+    None
+    """
+    if not isinstance(img.base, mmap.mmap) or not hasattr(mmap, 'MADV_DONTNEED'):
+        return
+    origin = np.frombuffer(img.base, dtype=np.uint8).ctypes.data
+    start = img.ctypes.data - origin + y0 * img.strides[0]
+    end = img.ctypes.data - origin + y1 * img.strides[0]
+    start -= start % mmap.PAGESIZE
+    img.base.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+
+def tiled_roi_stats(img, frame_list, tile_size=1024, classifier=cf.default_classifier, class_name='signal', output=None):
+    """
+    Per-ROI statistics of the color mask, computed tile by tile.
+
+    Parameters:
+    img (numpy.ndarray): BGR, BGRA or grayscale image, typically a memmap from `open_image`; only the tiles
+        intersecting ROIs are read. A grayscale image is classified as its BGR conversion.
+    frame_list (list): Reorganized ROI frames as [[start_x, start_y], [end_x, end_y]].
+    tile_size (int): Side of the tiles in pixels.
+    classifier (color_classifier.ColorClassifier): Precompiled color filter; the default BGR filter by default.
+    class_name (str): Class of `classifier` counted as signal.
+    output (numpy.ndarray): Writable array of the same shape (e.g. `np.lib.format.open_memmap`) on which the
+        signal pixels inside the ROIs are painted yellow (white for grayscale), as in
+        `signal_detector_in_roi.signal_in_roi`. Optional.
+
+    Returns:
+    numpy.ndarray: One row per frame, of dtype `ROI_STATS_DTYPE`, equal to `RoiIntegral(mask, img).stats(frame_list)`.
+    """
+    height, width = img.shape[:2]
+    table = np.zeros(len(frame_list), dtype=ROI_STATS_DTYPE)
+    if len(frame_list) == 0:
+        return table
+
+    frames = np.asarray(frame_list, dtype=np.int64).reshape(-1, 4)
+    x0, x1 = np.clip(frames[:, 0], 0, width), np.clip(frames[:, 2], 0, width)
+    y0, y1 = np.clip(frames[:, 1], 0, height), np.clip(frames[:, 3], 0, height)
+    pixels = np.zeros(len(frames))
+    moment_x = np.zeros(len(frames))
+    moment_y = np.zeros(len(frames))
+    intensity = np.zeros(len(frames))
+    if output is not None:
+        yellow = 255 if output.ndim == 2 else (0, 255, 255, 255)[:output.shape[2]]
+
+    tiles = roi_tiles((height, width), frame_list, tile_size)
+    for i, (ty0, ty1, tx0, tx1) in enumerate(tiles):
+        tile = np.ascontiguousarray(img[ty0:ty1, tx0:tx1])  # 只有這一塊會從檔案讀入記憶體
+        if tile.ndim == 2:
+            # 灰階影像：強度即為像素值，顏色濾鏡則套用在其三通道版本上
+            gray = tile
+            mask = classifier.mask(cv.cvtColor(tile, cv.COLOR_GRAY2BGR), class_name) > 0
+        else:
+            gray = cv.cvtColor(tile, cv.COLOR_BGRA2GRAY if tile.shape[2] == 4 else cv.COLOR_BGR2GRAY)
+            mask = classifier.mask(tile, class_name) > 0
+
+        # ROI 與此區塊的交集 (區塊內座標)
+        rx0, rx1 = np.maximum(x0, tx0) - tx0, np.minimum(x1, tx1) - tx0
+        ry0, ry1 = np.maximum(y0, ty0) - ty0, np.minimum(y1, ty1) - ty0
+        for roi in np.flatnonzero((rx0 < rx1) & (ry0 < ry1)):
+            region = (slice(ry0[roi], ry1[roi]), slice(rx0[roi], rx1[roi]))
+            part = mask[region]
+            pixels[roi] += np.count_nonzero(part)
+            moment_x[roi] += part.sum(axis=0) @ np.arange(tx0 + rx0[roi], tx0 + rx1[roi])
+            moment_y[roi] += part.sum(axis=1) @ np.arange(ty0 + ry0[roi], ty0 + ry1[roi])
+            intensity[roi] += gray[region][part].sum(dtype=np.float64)
+            if output is not None:
+                output[ty0:ty1, tx0:tx1][region][part] = yellow
+
+        # 一整列區塊處理完後，將其列從常駐記憶體釋放，使 RSS 不隨影像大小成長
+        if i + 1 == len(tiles) or tiles[i + 1][0] != ty0:
+            release_rows(img, ty0, ty1)
+            if output is not None:
+                release_rows(output, ty0, ty1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table['centroid_x'] = moment_x / pixels
+        table['centroid_y'] = moment_y / pixels
+    table['intensity'] = intensity
+    table['roi'] = np.arange(len(frames))
+    table['x0'], table['y0'], table['x1'], table['y1'] = x0, y0, x1, y1
+    table['pixels'] = pixels
+    return table
+
+
+def copy_tiled(img, path, tile_size=1024):
+    """
+    Copy an image into a new `.npy` memmap, tile by tile.
+
+    Returns:
+    numpy.memmap: The writable copy.
+    """
+    output = np.lib.format.open_memmap(path, mode='w+', dtype=img.dtype, shape=img.shape)
+    for y in range(0, img.shape[0], tile_size):
+        output[y:y + tile_size] = img[y:y + tile_size]
+        release_rows(img, y, y + tile_size)
+        release_rows(output, y, y + tile_size)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiled ROI signal statistics of very large images.")
+    parser.add_argument('image', help=".npy, .raw (with --shape) or any image readable by OpenCV")
+    parser.add_argument('--roi', required=True, help="ROI file (.json / .csv), see selecting_roi_frame.save_frame_list")
+    parser.add_argument('--shape', type=int, nargs=3, default=None, metavar=('HEIGHT', 'WIDTH', 'CHANNELS'),
+                        help="shape of a .raw image (8-bit)")
+    parser.add_argument('--tile-size', type=int, default=1024, help="side of the tiles in pixels")
+    parser.add_argument('--output-dir', default=None, help='defaults to "./outputs_<current time>/"')
+    parser.add_argument('--paint', action='store_true', help="also write the painted image as <name>.npy")
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or "./outputs_" + time.strftime("%Y%m%d_%H%M%S") + "/"
+    os.makedirs(output_dir, exist_ok=True)
+    name = os.path.basename(args.image)
+    stem = os.path.splitext(name)[0]
+
+    start = time.perf_counter()
+    img = open_image(args.image, args.shape)
+    frame_list = srf.load_frame_list(args.roi)
+    output = copy_tiled(img, os.path.join(output_dir, stem + ".npy"), args.tile_size) if args.paint else None
+    table = tiled_roi_stats(img, frame_list, args.tile_size, output=output)
+    if output is not None:
+        output.flush()
+    write_roi_stats(os.path.join(output_dir, stem + "_roi_stats.csv"), [(name, table)])
+    print(f"{name}: {int(table['pixels'].sum())} signal pixels, {time.perf_counter() - start:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+單調遞增時間軸 (`micro_sec`) 上的區間查詢：以二分搜尋找出 [t0, t1] 的範圍，回傳不複製資料的 view，
+讓註解與訊號垂直線只針對可見範圍 `[time_anchor - zoom/2, time_anchor + zoom/2]` 計算；
+每次操作的成本與視窗大小成正比，而非整條波形的長度。
+
+- 可見範圍的統計量 (`window_stats`) 不掃描視窗：最小/最大值由 `MinMaxPyramid` 的區塊取得，
+  訊號點數則以二分搜尋訊號點的時間，皆為 O(log n)，即使視窗是整條波形也一樣。
+
+---
+
+Range queries on a monotonic time axis (`micro_sec`): the window [t0, t1] is located with binary searches
+and returned as zero-copy views, so that annotations and signal bars are computed for the visible
+`[time_anchor - zoom/2, time_anchor + zoom/2]` range only; the cost of an interaction scales with the window
+size, not with the trace length.
+
+- The statistics of the window (`window_stats`) do not scan it: the minimum/maximum come from the buckets of
+  a `MinMaxPyramid` and the signal count from binary searches on the signal times, all in O(log n), even when
+  the window is the whole trace.
+"""
+import numpy as np
+
+
+class TimeIndex():
+    def __init__(self, micro_sec):
+        self.micro_sec = np.asarray(micro_sec)   # 時間軸 (需單調遞增)；也可以是依時間排序的訊號點時間
+
+    def __len__(self):
+        return len(self.micro_sec)
+
+    def slice(self, t0, t1):
+        """
+        Index range of the samples with t0 <= time <= t1, in O(log n).
+
+        Returns:
+        slice
+        """
+        i0 = int(np.searchsorted(self.micro_sec, t0, side='left'))
+        i1 = int(np.searchsorted(self.micro_sec, t1, side='right'))
+        return slice(i0, max(i0, i1))
+
+    def centered(self, time_anchor, zoom):
+        """
+        Index range of the slider window [time_anchor - zoom/2, time_anchor + zoom/2].
+
+        Returns:
+        slice
+        """
+        return self.slice(time_anchor - zoom / 2, time_anchor + zoom / 2)
+
+    def window(self, t0, t1, *arrays):
+        """
+        Zero-copy views of the time axis, and of arrays aligned with it, inside [t0, t1].
+
+        Parameters:
+        t0 (float): Left edge of the window.
+        t1 (float): Right edge of the window.
+        arrays (numpy.ndarray): Arrays of the same length as the time axis (e.g. `mini_volts`).
+
+        Returns:
+        tuple: (micro_sec view, *array views)
+        """
+        window = self.slice(t0, t1)
+        return (self.micro_sec[window], *(np.asarray(array)[window] for array in arrays))
+
+    def window_stats(self, t0, t1, pyramid=None, signals=None):
+        """
+        Statistics of the samples inside [t0, t1], in O(log n) whatever the window size.
+
+        Parameters:
+        t0 (float): Left edge of the window.
+        t1 (float): Right edge of the window.
+        pyramid (lod_renderer.MinMaxPyramid): Pyramid of the same trace, for 'min' and 'max'; optional.
+        signals (TimeIndex): Times of the signal samples (e.g. `micro_sec[stats.indices_above(max_noise)]`),
+            for 'signals'; optional.
+
+        Returns:
+        dict: 'samples', 'min', 'max' (NaN for an empty window or without a pyramid) and 'signals' (None
+        without signal times).
+        """
+        window = self.slice(t0, t1)
+        low, high = pyramid.range_minmax(window.start, window.stop) if pyramid is not None else (np.nan, np.nan)
+        if signals is not None:
+            found = signals.slice(t0, t1)
+        return {
+            'samples': window.stop - window.start,
+            'min': float(low),
+            'max': float(high),
+            'signals': None if signals is None else found.stop - found.start,
+        }
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+每個 TOF-MS 檔案的統計量快取：於讀檔時計算一次基線 (眾數)、最大值、雜訊標準差，以及排序後的電壓；
+之後每次調整訊雜比滑桿，只需以二分搜尋在排序後的電壓中找出門檻位置，即可取得所有訊號點。
+
+- 「訊號數 - 訊雜比」曲線同樣只以二分搜尋一次算出 (`signal_curve`)，並以曲線的轉折點建議訊雜比 (`suggest_signal_ratio`)。
+
+---
+
+Per-file statistics cache for TOF-MS traces: baseline (mode), maximum, noise sigma and a sorted copy of
+the voltages are computed once at load time; every SNR / signal ratio change then only needs a binary
+search on the sorted voltages to get all the signal samples, i.e. O(log n + k) instead of O(n).
+
+- The whole "number of signals vs. signal ratio" curve is obtained with binary searches too
+  (`signal_curve`), and its knee is offered as a suggested signal ratio (`suggest_signal_ratio`).
+"""
+import numpy as np
+
+import instrumentation as instr
+from peak_detector import noise_threshold
+
+
+class TraceStats():
+    @instr.timed('trace_stats')
+    def __init__(self, mini_volts):
+        mini_volts = np.asarray(mini_volts)
+        self.order = np.argsort(mini_volts, kind='stable')  # 由小到大排序後，各點於原始資料中的索引
+        self.sorted_volts = mini_volts[self.order]          # 排序後的電壓
+        self.size = len(mini_volts)                         # 取樣點數
+        self.min = self.sorted_volts[0]                     # 最小值
+        self.max = self.sorted_volts[-1]                    # 最大值
+        self.baseline = self.__mode()                       # 雜訊基線 (眾數)
+        self.noise_sigma = self.__noise_sigma(mini_volts)   # 雜訊標準差
+        self.__volts = mini_volts                           # 原始資料 (不複製)，供門檻掃描使用
+        self.__rises = None                                 # 門檻掃描用的上升邊界，第一次使用時才建立
+
+    def __mode(self):
+        """
+        Compute the mode from the sorted voltages (the smallest value on ties, as `pandas.Series.mode()`).
+
+        Returns:
+        float
+        """
+        # 排序後相同數值必定相鄰，以差分找出每段相同數值的起點
+        run_starts = np.flatnonzero(np.concatenate(([True], self.sorted_volts[1:] != self.sorted_volts[:-1])))
+        run_lengths = np.diff(np.append(run_starts, self.size))
+        return self.sorted_volts[run_starts[np.argmax(run_lengths)]]
+
+    def __noise_sigma(self, mini_volts):
+        """
+        Estimate the noise standard deviation around the baseline with a sigma-clipped RMS of the deviations,
+        so that the signals do not inflate it.
+
+        The clipping starts from the median absolute deviation and is repeated until it converges. The MAD
+        alone is biased on quantized traces (0, or a multiple of the quantization step), so it is only the
+        starting point, and the clipping range never drops below one quantization step.
+
+        Returns:
+        float: 0 only for a constant trace.
+        """
+        deviations = mini_volts - self.baseline
+        distances = np.abs(deviations)
+        nonzero = distances[distances > 0]
+        if len(nonzero) == 0:
+            return 0.0
+        step = nonzero.min()  # 量化間隔 (最接近基線的非零偏差)
+
+        sigma = 1.4826 * np.median(distances)
+        if sigma == 0:
+            sigma = 1.4826 * np.median(nonzero)
+        for _ in range(50):
+            # 只保留 3 sigma 以內的偏差 (訊號被排除)，以其 RMS 更新 sigma，直到不再變化
+            inside = distances <= max(3 * sigma, step)
+            clipped = np.sqrt(np.mean(np.square(deviations[inside])))
+            if clipped == sigma:
+                break
+            sigma = clipped
+        return float(sigma)
+
+    def max_noise(self, signal_ratio):
+        """
+        Threshold of the signal ratio / SNR slider.
+
+        Parameters:
+        signal_ratio (float): Slider value in (0, 1].
+
+        Returns:
+        float
+        """
+        return noise_threshold(self.max, self.baseline, signal_ratio)
+
+    def count_above(self, threshold):
+        """
+        Number of samples strictly above `threshold`, in O(log n).
+
+        Parameters:
+        threshold (float)
+
+        Returns:
+        int
+        """
+        return self.size - np.searchsorted(self.sorted_volts, threshold, side='right')
+
+    def indices_above(self, threshold):
+        """
+        Indices of the samples strictly above `threshold`, in time order.
+
+        Parameters:
+        threshold (float)
+
+        Returns:
+        numpy.ndarray: O(log n + k log k) for k signal samples.
+        """
+        position = np.searchsorted(self.sorted_volts, threshold, side='right')
+        return np.sort(self.order[position:])
+
+    def __crossings(self):
+        """
+        Sorted lower and upper bounds of the thresholds at which each sample starts an event.
+
+        Sample i starts an event for every threshold t with v[i-1] <= t < v[i] (t < v[0] for the first one),
+        so the number of events above t is #{lower <= t} - #{upper <= t}. Built once, on first use.
+        """
+        if self.__rises is None:
+            volts = self.__volts
+            rise = np.flatnonzero(volts[1:] > volts[:-1]) + 1
+            lower = np.concatenate(([-np.inf], volts[rise - 1]))
+            upper = np.concatenate(([volts[0]], volts[rise]))
+            self.__rises = (np.sort(lower), np.sort(upper))
+        return self.__rises
+
+    def signal_curve(self, signal_ratios):
+        """
+        Number of signal samples and of signal events (as counted by `peak_detector.detect_peaks`) for many
+        signal ratios at once, with binary searches only.
+
+        Parameters:
+        signal_ratios (array-like): Slider values in (0, 1].
+
+        Returns:
+        tuple: (samples, events) arrays of the same shape as `signal_ratios`.
+        """
+        thresholds = self.max_noise(np.asarray(signal_ratios, dtype=np.float64))
+        samples = self.size - np.searchsorted(self.sorted_volts, thresholds, side='right')
+        lower, upper = self.__crossings()
+        events = np.searchsorted(lower, thresholds, side='right') - np.searchsorted(upper, thresholds, side='right')
+        return samples, events
+
+    def suggest_signal_ratio(self, signal_ratios=None):
+        """
+        Suggest a signal ratio at the knee of the "number of events vs. signal ratio" curve: the largest ratio
+        before the noise floods the count (Kneedle on the log of the count: the point farthest below the chord
+        of the normalized curve).
+
+        Parameters:
+        signal_ratios (array-like): Candidate values, increasing; defaults to the slider steps 0.01, 0.02, ..., 1.
+
+        Returns:
+        float: The suggested ratio, or None if the curve has no knee (e.g. the count grows steadily).
+        """
+        if signal_ratios is None:
+            signal_ratios = np.round(np.arange(1, 101) * 0.01, 2)
+        signal_ratios = np.asarray(signal_ratios, dtype=np.float64)
+        events = np.log1p(self.signal_curve(signal_ratios)[1])
+        if len(signal_ratios) < 3 or events[-1] == events[0]:
+            return None
+
+        x = (signal_ratios - signal_ratios[0]) / (signal_ratios[-1] - signal_ratios[0])
+        y = (events - events[0]) / (events[-1] - events[0])
+        knee = np.argmax(x - y)
+        return float(signal_ratios[knee]) if x[knee] - y[knee] > 0 else None